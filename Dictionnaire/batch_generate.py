@@ -0,0 +1,175 @@
+# MIT License
+#
+# Copyright (c) 2023 ESUNA - Sourigna SIMMALAVONG
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from beartype import beartype
+from beartype.typing import List, Dict, Optional, Tuple, Any
+
+from Dictionnaire.deduplicator import DedupMode
+from Dictionnaire.generate_html_dictionary import layouts, make_output_formats, check_costs
+from Dictionnaire.manifest import Manifest, BuildStatus, manifest_name, update_html_dictionaries
+from Dictionnaire.pipeline_profiler import PipelineProfiler, write_report
+
+
+class BatchResult:
+    @beartype
+    def __init__(self, src: Path, duplicates: Dict[Path, int], error: Optional[str] = None,
+                 status: Optional[BuildStatus] = None, entry: Optional[Dict[str, Any]] = None,
+                 profile: Optional[Dict[str, Any]] = None):
+        self.src: Path = src
+        self.duplicates: Dict[Path, int] = duplicates
+        self.error: Optional[str] = error
+        self.status: Optional[BuildStatus] = status
+        self.entry: Optional[Dict[str, Any]] = entry  # new manifest entry
+        self.profile: Optional[Dict[str, Any]] = profile  # profiler report of the worker (see pipeline_profiler)
+
+
+@beartype
+def is_generated_dictionary(path: Path) -> bool:
+    return any(path.stem.endswith(f'_{layout}') for layout in layouts)
+
+
+# A directory is searched recursively for markdown dictionaries, anything else is used as a glob pattern.
+# Returns the sorted inputs and the root directory their outputs are mirrored from.
+@beartype
+def collect_inputs(pattern: str) -> Tuple[List[Path], Path]:
+    if Path(pattern).is_dir():
+        root: Path = Path(pattern)
+        paths: List[Path] = list(root.rglob('*.md'))
+    else:
+        paths: List[Path] = [Path(path) for path in glob.glob(pattern, recursive=True)]
+        root: Path = Path(os.path.commonpath([path.parent for path in paths])) if paths else Path('.')
+    paths = sorted(path for path in paths if path.is_file() and not is_generated_dictionary(path))
+    return paths, root
+
+
+@beartype
+def generate_one(src: Path, out_dir: Path, dedup: str, entry: Optional[Dict[str, Any]] = None,
+                 profile: bool = False) -> BatchResult:
+    profiler: Optional[PipelineProfiler] = PipelineProfiler() if profile else None
+    if profiler is not None:
+        profiler.calibrate(check_costs)
+        profiler.start()
+    try:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        status: BuildStatus
+        duplicates: Dict[Path, int]
+        new_entry: Dict[str, Any]
+        status, duplicates, new_entry = update_html_dictionaries(src, make_output_formats(src, out_dir), entry,
+                                                                 DedupMode[dedup], profiler)
+        result: BatchResult = BatchResult(src, duplicates, status=status, entry=new_entry)
+    except Exception as exception:
+        result: BatchResult = BatchResult(src, {}, f'{type(exception).__name__}: {exception}')
+    if profiler is not None:
+        profiler.stop()
+        result.profile = profiler.report()
+    return result
+
+
+# Results are returned in the (sorted) order of the inputs, whatever the order the workers finish in.
+# The manifest (if any) is only read and updated by the calling process.
+# With a profiler, every worker profiles its inputs and their reports are merged into it, in the order of the inputs:
+# its hooks are called with the report of each input.
+@beartype
+def generate_batch(srcs: List[Path], root: Path, out_dir: Path, jobs: Optional[int] = None,
+                   dedup: DedupMode = DedupMode.line, manifest: Optional[Manifest] = None,
+                   profiler: Optional[PipelineProfiler] = None) -> List[BatchResult]:
+    out_dirs: List[Path] = [out_dir.joinpath(src.parent.relative_to(root)) for src in srcs]
+    dedups: List[str] = [dedup.name] * len(srcs)
+    keys: List[str] = [str(src.resolve()) for src in srcs]
+    entries: List[Optional[Dict[str, Any]]] = [manifest.entries.get(key) if manifest is not None else None
+                                               for key in keys]
+    profiles: List[bool] = [profiler is not None] * len(srcs)
+    if jobs == 1 or len(srcs) <= 1:
+        results: List[BatchResult] = list(map(generate_one, srcs, out_dirs, dedups, entries, profiles))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            chunksize: int = max(1, len(srcs) // (4 * (jobs or os.cpu_count() or 1)))
+            results: List[BatchResult] = list(executor.map(generate_one, srcs, out_dirs, dedups, entries, profiles,
+                                                           chunksize=chunksize))
+    if profiler is not None:
+        for result in results:
+            profiler.merge(str(result.src), result.profile)
+    if manifest is not None:
+        for key, result in zip(keys, results):
+            if result.entry is not None:
+                manifest.entries[key] = result.entry
+            else:
+                manifest.entries.pop(key, None)
+        manifest.save()
+    return results
+
+
+if __name__ == '__main__':
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description='Generate the html dictionaries of every dictionary note of a vault directory or glob.')
+    parser.add_argument('inputs', metavar='vault_dir_or_glob',
+                        help='directory searched recursively for *.md, or a glob such as "vault/**/*_dict.md"')
+    parser.add_argument('out_dir', type=Path, metavar='output_dir',
+                        help='outputs mirror the directory tree of the inputs')
+    parser.add_argument('--jobs', '-j', type=int, default=None, help='worker processes (default: cpu count)')
+    parser.add_argument('--dedup', choices=[mode.name for mode in DedupMode], default=DedupMode.line.name,
+                        help='remove duplicated lines (default) or duplicated (parenthesis) entries')
+    parser.add_argument('--force', action='store_true',
+                        help='rebuild every output even if the manifest says it is up to date')
+    parser.add_argument('--profile', type=Path, metavar='report.json',
+                        help='write the stages times, counters and peak memory of every input and their total as JSON')
+    args: argparse.Namespace = parser.parse_args()
+
+    srcs: List[Path]
+    root: Path
+    srcs, root = collect_inputs(args.inputs)
+    if not srcs:
+        raise Exception(f'no dictionary found in: {args.inputs}')
+
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    manifest: Manifest = Manifest(args.out_dir.joinpath(manifest_name))
+    if args.force:
+        manifest.entries.clear()
+    profiler: Optional[PipelineProfiler] = None
+    file_reports: Dict[str, Dict[str, Any]] = {}
+    if args.profile is not None:
+        profiler = PipelineProfiler()
+        profiler.add_hook(file_reports.__setitem__)
+    started: float = time.perf_counter()
+    results: List[BatchResult] = generate_batch(srcs, root, args.out_dir, args.jobs, DedupMode[args.dedup], manifest,
+                                                profiler)
+    if profiler is not None:
+        # The total times are summed over the workers, elapsed_s is the wall time of the whole batch.
+        write_report(args.profile, {'elapsed_s': time.perf_counter() - started, 'total': profiler.report(),
+                                    'files': file_reports})
+    errors: int = 0
+    for result in results:
+        if result.error is not None:
+            errors += 1
+            print(f'{result.src}: ERROR {result.error}')
+        else:
+            print(f'{result.src}: {result.status.name}, {sum(result.duplicates.values())} duplicate(s) removed')
+    print(f'{len(results) - errors}/{len(results)} dictionaries generated')
+    sys.exit(1 if errors else 0)
@@ -0,0 +1,255 @@
+# MIT License
+#
+# Copyright (c) 2023 ESUNA - Sourigna SIMMALAVONG
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import argparse
+import mmap
+import struct
+import sys
+import time
+from array import array
+from pathlib import Path
+
+from beartype import beartype
+from beartype.typing import List, Dict, Optional, Tuple, Iterator
+
+from Dictionnaire.chinese_struct import ChineseStruct
+from Dictionnaire.chinese_token import ChineseToken
+from Dictionnaire.deduplicator import Deduplicator
+from Dictionnaire.dictionary_table import DictionaryTable
+from Dictionnaire.generate_html_dictionary import make_output_formats, write_html_dictionaries
+
+# Binary dictionary, memory-mapped: opening it only reads the header, rows are decoded when accessed.
+# Little endian layout, every table is an array of fixed width unsigned integers, the narrowest of uint8, uint16 and
+# uint32 able to hold its values:
+#   header                magic, version, the count of strings, rows, lines and blank lines, then the offset and the
+#                         width of every section
+#   string offsets        string i is string_data[string_offsets[i]:string_offsets[i + 1]], utf-8
+#   string data
+#   rows                  pinyin, ideogram, translation string ids of every row
+#   line ends             rows of source line i: [line_ends[i - 1], line_ends[i]), as in DictionaryTable
+#   blank lines           line index, string id of every blank line, kept as it is
+#   ideogram index        rows sorted by ideogram (utf-8 byte order, i.e. code point order), then by row
+
+magic: bytes = b'OCDB'
+version: int = 1
+# magic, version, strings, rows, lines, blank lines, the 6 section offsets, then the 6 section widths
+header_struct: struct.Struct = struct.Struct('<4sIIIII6Q6B')
+row_width: int = 3
+typecodes: Dict[int, str] = {1: 'B', 2: 'H', 4: 'I'}
+
+
+@beartype
+def uint_array(values: List[int]) -> Tuple[bytes, int]:
+    width: int = next(width for width in typecodes if max(values, default=0) < 1 << (8 * width))
+    table: array = array(typecodes[width], values)
+    if sys.byteorder == 'big':
+        table.byteswap()
+    return table.tobytes(), width
+
+
+@beartype
+def write_binary_dictionary(table: DictionaryTable, path: Path):
+    strings: List[str] = list(table.strings)
+    blank_ids: List[int] = []
+    for line_index, blank_line in sorted(table.blank_lines.items()):
+        blank_ids += [line_index, len(strings)]
+        strings.append(blank_line)
+    encoded: List[bytes] = [string.encode('utf-8') for string in strings]
+    string_offsets: List[int] = [0]
+    for data in encoded:
+        string_offsets.append(string_offsets[-1] + len(data))
+    rows: List[int] = [string_id for row in zip(table.pinyins, table.ideograms, table.translations)
+                       for string_id in row]
+    ideogram_index: List[int] = sorted(range(len(table)), key=lambda row: (encoded[table.ideograms[row]], row))
+
+    tables: List[Tuple[bytes, int]] = [uint_array(string_offsets), (b''.join(encoded), 1), uint_array(rows),
+                                       uint_array(list(table.line_ends)), uint_array(blank_ids),
+                                       uint_array(ideogram_index)]
+    sections: List[bytes] = []
+    offsets: List[int] = []
+    position: int = header_struct.size
+    for section, width in tables:
+        # Aligned on the width of the table (the string data may end anywhere)
+        padding: int = -position % width
+        sections.append(b'\0' * padding + section)
+        offsets.append(position + padding)
+        position += len(sections[-1])
+    tmp_path: Path = path.with_name(f'{path.name}.tmp')
+    with tmp_path.open('wb') as tmp_file:
+        tmp_file.write(header_struct.pack(magic, version, len(strings), len(table), len(table.line_ends),
+                                          len(table.blank_lines), *offsets, *(width for _, width in tables)))
+        for section in sections:
+            tmp_file.write(section)
+    tmp_path.replace(path)
+
+
+# Row view, usable wherever a ChineseStruct is expected (e.g. restructure).
+class BinaryRow(ChineseStruct):
+    __slots__ = ('dictionary', 'index')
+
+    def __init__(self, dictionary: 'BinaryDictionary', index: int):
+        self.dictionary: BinaryDictionary = dictionary
+        self.index: int = index
+
+    @property
+    def pinyin(self) -> str:
+        return self.dictionary.string(self.dictionary.rows[row_width * self.index])
+
+    @property
+    def ideogram(self) -> str:
+        return self.dictionary.string(self.dictionary.rows[row_width * self.index + 1])
+
+    @property
+    def translation(self) -> str:
+        return self.dictionary.string(self.dictionary.rows[row_width * self.index + 2])
+
+
+class BinaryDictionary:
+    @beartype
+    def __init__(self, path: Path):
+        self.file = path.open('rb')
+        self.buffer: mmap.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        header: Tuple = header_struct.unpack_from(self.buffer, 0)
+        if header[0] != magic or header[1] != version:
+            raise Exception(f'not a binary dictionary (version {version}): {path}')
+        strings, rows, lines, blank_lines = header[2:6]
+        offsets: Tuple[int, ...] = header[6:12]
+        widths: Tuple[int, ...] = header[12:]
+        self.string_offsets: memoryview = self.table(offsets[0], widths[0], strings + 1)
+        self.string_data: int = offsets[1]
+        self.rows: memoryview = self.table(offsets[2], widths[2], row_width * rows)
+        self.line_ends: memoryview = self.table(offsets[3], widths[3], lines)
+        self.blank_lines: memoryview = self.table(offsets[4], widths[4], 2 * blank_lines)
+        self.ideogram_index: memoryview = self.table(offsets[5], widths[5], rows)
+
+    # View over the mapped file, no copy (but on big endian machines)
+    @beartype
+    def table(self, offset: int, width: int, count: int):
+        view: memoryview = memoryview(self.buffer)[offset:offset + width * count]
+        if sys.byteorder == 'big':
+            swapped: array = array(typecodes[width], view)
+            swapped.byteswap()
+            return swapped
+        return view.cast(typecodes[width])
+
+    def close(self):
+        for view in [self.string_offsets, self.rows, self.line_ends, self.blank_lines, self.ideogram_index]:
+            if isinstance(view, memoryview):
+                view.release()
+        self.buffer.close()
+        self.file.close()
+
+    def __enter__(self) -> 'BinaryDictionary':
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.ideogram_index)
+
+    # Called for every field: not wrapped by beartype.
+    def string_bytes(self, string_id: int) -> bytes:
+        start: int = self.string_data + self.string_offsets[string_id]
+        return self.buffer[start:self.string_data + self.string_offsets[string_id + 1]]
+
+    def string(self, string_id: int) -> str:
+        return self.string_bytes(string_id).decode('utf-8')
+
+    @beartype
+    def __getitem__(self, index: int) -> BinaryRow:
+        if not -len(self) <= index < len(self):
+            raise IndexError(index)
+        return BinaryRow(self, index % len(self))
+
+    def __iter__(self) -> Iterator[BinaryRow]:
+        return (BinaryRow(self, index) for index in range(len(self)))
+
+    # Rows of an ideogram, in dictionary order: binary search over the ideogram index
+    @beartype
+    def lookup(self, ideogram: str) -> List[BinaryRow]:
+        key: bytes = ideogram.encode('utf-8')
+        low: int = 0
+        high: int = len(self)
+        while low < high:
+            middle: int = (low + high) // 2
+            if self.string_bytes(self.rows[row_width * self.ideogram_index[middle] + 1]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        rows: List[BinaryRow] = []
+        while low < len(self) and self.string_bytes(self.rows[row_width * self.ideogram_index[low] + 1]) == key:
+            rows.append(BinaryRow(self, self.ideogram_index[low]))
+            low += 1
+        return rows
+
+    # Same items as parse_lines, to feed render_lines or write_html_dictionaries directly.
+    @beartype
+    def parsed_lines(self) -> Iterator[Tuple[str, Optional[List[Tuple[ChineseStruct, str]]]]]:
+        blank_lines: Dict[int, int] = {self.blank_lines[index]: self.blank_lines[index + 1]
+                                       for index in range(0, len(self.blank_lines), 2)}
+        start: int = 0
+        for line_index, end in enumerate(self.line_ends):
+            if line_index in blank_lines:
+                yield self.string(blank_lines[line_index]), None
+            else:
+                rows: List[BinaryRow] = [BinaryRow(self, index) for index in range(start, end)]
+                yield '', [(row, row.translation) for row in rows]
+            start = end
+
+
+if __name__ == '__main__':
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description='Convert (pinyin ideogram translation) dictionaries to a memory-mapped binary format, and back.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser: argparse.ArgumentParser = subparsers.add_parser('build', help='markdown dictionaries to binary')
+    build_parser.add_argument('inputs', type=Path, nargs='+', metavar='path_to_input_dictionary.md')
+    build_parser.add_argument('output', type=Path, metavar='dictionary.bin')
+    lookup_parser: argparse.ArgumentParser = subparsers.add_parser('lookup', help='entries of ideograms')
+    lookup_parser.add_argument('dictionary', type=Path, metavar='dictionary.bin')
+    lookup_parser.add_argument('ideograms', nargs='+')
+    export_parser: argparse.ArgumentParser = subparsers.add_parser('export', help='binary to the html dictionaries')
+    export_parser.add_argument('dictionary', type=Path, metavar='dictionary.bin')
+    export_parser.add_argument('out_dir', type=Path, metavar='output_dir')
+    args: argparse.Namespace = parser.parse_args()
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    start_time: float = time.perf_counter()
+    if args.command == 'build':
+        source_table: DictionaryTable = DictionaryTable.from_paths(args.inputs)
+        write_binary_dictionary(source_table, args.output)
+        print(f'{len(source_table)} entries written in {time.perf_counter() - start_time:.3f} s')
+        sys.exit(0)
+    with BinaryDictionary(args.dictionary) as binary_dictionary:
+        print(f'{len(binary_dictionary)} entries opened in {(time.perf_counter() - start_time) * 1000:.1f} ms')
+        if args.command == 'lookup':
+            for ideogram in args.ideograms:
+                for row in binary_dictionary.lookup(ideogram):
+                    print(f'({row.pinyin} {row.ideogram} {row.translation})')
+        else:
+            if not args.out_dir.is_dir():
+                raise Exception(f'argument is not a dir: {args.out_dir}')
+            outputs: Dict[Path, List[ChineseToken]] = make_output_formats(args.dictionary.with_suffix('.md'),
+                                                                          args.out_dir)
+            write_html_dictionaries(binary_dictionary.parsed_lines(), outputs,
+                                    {out_dict_path: Deduplicator() for out_dict_path in outputs})
+    print(f'{time.perf_counter() - start_time:.3f} s')
@@ -24,6 +24,8 @@ from beartype import beartype
 
 
 class ChineseStruct:
+    __slots__ = ('pinyin', 'ideogram')
+
     @beartype
     def __init__(self, pinyin: str, ideogram: str):
         self.pinyin: str = pinyin
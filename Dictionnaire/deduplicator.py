@@ -0,0 +1,76 @@
+# MIT License
+#
+# Copyright (c) 2023 ESUNA - Sourigna SIMMALAVONG
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+from enum import Enum, auto
+
+from beartype import beartype
+from beartype.typing import List, Set, Iterable
+
+
+class DedupMode(Enum):
+    line = auto(),  # a whole output line is dropped if it was already written
+    entry = auto(),  # each (parenthesis group) is dropped if it was already written
+
+
+# Order-preserving deduplication in a single pass: the first occurrence wins.
+# Share the same instance between several calls to deduplicate across several input files.
+class Deduplicator:
+    @beartype
+    def __init__(self, mode: DedupMode = DedupMode.line):
+        self.mode: DedupMode = mode
+        self.seen: Set[str] = set()
+        self.duplicates: int = 0
+
+    @beartype
+    def is_new(self, key: str) -> bool:
+        if key in self.seen:
+            self.duplicates += 1
+            return False
+        self.seen.add(key)
+        return True
+
+    @beartype
+    def filter_entries(self, entries: List[str]) -> List[str]:
+        if self.mode != DedupMode.entry:
+            return entries
+        return [entry for entry in entries if self.is_new(entry)]
+
+    @beartype
+    def keep_line(self, line: str) -> bool:
+        if line.strip() == '':  # blank lines are kept as they are
+            return True
+        if self.mode != DedupMode.line:
+            return True
+        return self.is_new(line)
+
+    # Restores the state reached after writing the given output lines, e.g. before appending to an existing output.
+    @beartype
+    def seed(self, out_lines: Iterable[str]):
+        for out_line in out_lines:
+            out_line = out_line.rstrip('\n')
+            if out_line.strip() == '':
+                continue
+            if self.mode == DedupMode.line:
+                self.seen.add(out_line)
+            elif self.mode == DedupMode.entry:
+                # The closing parenthesis of the last entry is not written (autocompletion)
+                self.seen.update(f'({entry})' for entry in f'{out_line[1:]})'[:-1].split(')('))
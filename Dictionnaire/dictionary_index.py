@@ -0,0 +1,214 @@
+# MIT License
+#
+# Copyright (c) 2023 ESUNA - Sourigna SIMMALAVONG
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import argparse
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from beartype import beartype
+from beartype.typing import List, Dict, Optional, Set, Tuple, Iterator, NamedTuple, Pattern
+
+import Dictionnaire.rulesets  # noqa: F401, makes the regex-rulesets modules importable
+from Dictionnaire.generate_html_dictionary import parse_lines, read_lines
+from Dictionnaire.manifest import hash_source
+from tone_analysis import untone_table
+
+# SQLite index of the (pinyin ideogram translation) entries of source dictionaries:
+# - ideogram, lower case toned pinyin and tone-stripped pinyin are indexed columns (exact and prefix lookups),
+# - translations are in an external content FTS5 table, synced per source in bulk (much faster than row triggers),
+# - every source is stored with its hash: only the changed sources are reindexed.
+
+schema_version: int = 2
+schema: str = '''
+create table sources (id integer primary key, path text unique not null, hash text not null);
+create table entries (id integer primary key, source integer not null references sources(id), line integer not null,
+                      ideogram text not null, pinyin text not null, folded_pinyin text not null,
+                      plain_pinyin text not null, translation text not null);
+create index entries_source on entries(source);
+create index entries_ideogram on entries(ideogram);
+create index entries_folded_pinyin on entries(folded_pinyin);
+create index entries_plain_pinyin on entries(plain_pinyin);
+create virtual table translations using fts5(translation, content='entries', content_rowid='id',
+                                             tokenize='unicode61 remove_diacritics 2');
+'''
+cjk_pattern: Pattern = re.compile(r'[⺀-⿕㆐-㆟㐀-䶿一-鿌豈-節]')
+pinyin_separators: Pattern = re.compile(r"[\s'’1-5]+")
+
+
+class IndexEntry(NamedTuple):
+    pinyin: str
+    ideogram: str
+    translation: str
+    path: str
+    line: int
+    id: int  # rowid of the entry, several entries can share a line
+
+
+@beartype
+def normalize_pinyin(pinyin: str) -> str:
+    # Tones, tone numbers, separators and case removed, v and u: typed for ü: 'Xī’ān' -> 'xian', 'lv4' -> 'lü'
+    return pinyin_separators.sub('', pinyin.translate(untone_table).lower().replace('u:', 'ü').replace('v', 'ü'))
+
+
+@beartype
+def open_index(db_path: Path, check_same_thread: bool = True) -> sqlite3.Connection:
+    connection: sqlite3.Connection = sqlite3.connect(db_path, check_same_thread=check_same_thread)
+    if connection.execute('pragma user_version').fetchone()[0] != schema_version:
+        with connection:
+            for table in ['translations', 'entries', 'sources']:
+                connection.execute(f'drop table if exists {table}')
+            connection.executescript(schema)
+            connection.execute(f'pragma user_version = {schema_version}')
+    return connection
+
+
+@beartype
+def delete_source(connection: sqlite3.Connection, source_id: int):
+    connection.execute("insert into translations(translations, rowid, translation) "
+                       "select 'delete', id, translation from entries where source = ?", (source_id,))
+    connection.execute('delete from entries where source = ?', (source_id,))
+
+
+@beartype
+def index_rows(src: Path, source_id: int) -> Iterator[Tuple[int, int, str, str, str, str, str]]:
+    for line_number, (_, entries) in enumerate(parse_lines(read_lines([src])), 1):
+        for chinese_struct, translation in entries or []:
+            yield (source_id, line_number, chinese_struct.ideogram, chinese_struct.pinyin,
+                   chinese_struct.pinyin.lower(), normalize_pinyin(chinese_struct.pinyin), translation)
+
+
+# Reindexes the sources which changed since the last update, and removes the sources which no longer exist.
+# Returns the number of indexed entries per reindexed source.
+@beartype
+def update_index(connection: sqlite3.Connection, srcs: List[Path]) -> Dict[Path, int]:
+    indexed: Dict[Path, int] = {}
+    with connection:
+        for source_id, path in connection.execute('select id, path from sources').fetchall():
+            if not Path(path).is_file():
+                delete_source(connection, source_id)
+                connection.execute('delete from sources where id = ?', (source_id,))
+        for src in srcs:
+            key: str = str(src.resolve())
+            src_hash: str = hash_source(src)[0]
+            row: Optional[Tuple[int, str]] = connection.execute('select id, hash from sources where path = ?',
+                                                                (key,)).fetchone()
+            if row is not None and row[1] == src_hash:
+                continue
+            if row is not None:
+                delete_source(connection, row[0])
+                connection.execute('update sources set hash = ? where id = ?', (src_hash, row[0]))
+                source_id: int = row[0]
+            else:
+                source_id = connection.execute('insert into sources(path, hash) values (?, ?)',
+                                               (key, src_hash)).lastrowid
+            connection.executemany('insert into entries(source, line, ideogram, pinyin, folded_pinyin, plain_pinyin, '
+                                   'translation) values (?, ?, ?, ?, ?, ?, ?)', index_rows(src, source_id))
+            connection.execute('insert into translations(rowid, translation) '
+                               'select id, translation from entries where source = ?', (source_id,))
+            indexed[src] = connection.execute('select count(*) from entries where source = ?',
+                                              (source_id,)).fetchone()[0]
+    return indexed
+
+
+@beartype
+def fts_query(text: str) -> str:
+    # Words are quoted (no FTS syntax error on user input), a trailing * is kept as a prefix query
+    return ' '.join(f'"{word.rstrip("*")}"' + ('*' if word.endswith('*') else '')
+                    for word in text.replace('"', '').split() if word.rstrip('*'))
+
+
+# by: ideogram, pinyin, translation, or auto (ideogram for chinese text, pinyin then translation otherwise).
+# A trailing * makes a prefix lookup.
+@beartype
+def lookup(connection: sqlite3.Connection, text: str, by: str = 'auto', limit: int = 20) -> List[IndexEntry]:
+    if by == 'auto':
+        if cjk_pattern.search(text):
+            return lookup(connection, text, 'ideogram', limit)
+        entries: List[IndexEntry] = lookup(connection, text, 'pinyin', limit)
+        if len(entries) < limit:
+            # Entries found by both their pinyin and their translation are only returned once
+            found: Set[int] = {entry.id for entry in entries}
+            entries += [entry for entry in lookup(connection, text, 'translation', limit)
+                        if entry.id not in found][:limit - len(entries)]
+        return entries
+    select: str = 'select e.pinyin, e.ideogram, e.translation, s.path, e.line, e.id from entries e ' \
+                  'join sources s on s.id = e.source '
+    prefix: bool = text.endswith('*')
+    if by == 'translation':
+        query: str = fts_query(text)
+        if not query:
+            return []
+        rows: sqlite3.Cursor = connection.execute(select + 'join translations t on t.rowid = e.id '
+                                                  'where translations match ? order by t.rank limit ?',
+                                                  (query, limit))
+    elif by in ['ideogram', 'pinyin']:
+        value: str = text.rstrip('*').strip()
+        column: str = by
+        if by == 'pinyin':
+            # Tone-stripped lookup if no tone is given, case-insensitive otherwise
+            if value.translate(untone_table) == value:
+                column = 'plain_pinyin'
+                value = normalize_pinyin(value)
+            else:
+                column = 'folded_pinyin'
+                value = value.lower()
+        # Prefix as a range, which uses the column index
+        condition: str = f'e.{column} >= ? and e.{column} < ?' if prefix else f'e.{column} = ?'
+        parameters: Tuple[str, ...] = (value, value + '\U0010ffff') if prefix else (value,)
+        # Shortest matches first for a prefix, index order otherwise (no sort)
+        order: str = f'length(e.{column}), e.id' if prefix else 'e.id'
+        rows: sqlite3.Cursor = connection.execute(select + f'where {condition} order by {order} limit ?',
+                                                  parameters + (limit,))
+    else:
+        raise Exception(f'unknown lookup: {by}')
+    return [IndexEntry(*row) for row in rows]
+
+
+if __name__ == '__main__':
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description='Index (pinyin ideogram translation) dictionaries in SQLite and look words up.')
+    parser.add_argument('db', type=Path, metavar='index.sqlite')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    index_parser: argparse.ArgumentParser = subparsers.add_parser('index', help='(re)index the changed sources')
+    index_parser.add_argument('inputs', type=Path, nargs='+', metavar='path_to_input_dictionary.md')
+    query_parser: argparse.ArgumentParser = subparsers.add_parser('query', help='look words up')
+    query_parser.add_argument('text', nargs='+', help='ideogram, pinyin (with or without tones) or translation words, '
+                                                      'a trailing * makes a prefix lookup')
+    query_parser.add_argument('--by', choices=['auto', 'ideogram', 'pinyin', 'translation'], default='auto')
+    query_parser.add_argument('--limit', type=int, default=20)
+    args: argparse.Namespace = parser.parse_args()
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    index_connection: sqlite3.Connection = open_index(args.db)
+    start: float = time.perf_counter()
+    if args.command == 'index':
+        for path, count in update_index(index_connection, args.inputs).items():
+            print(f'{path}: {count} entries indexed')
+        print(f'{time.perf_counter() - start:.3f} s')
+    else:
+        for entry in lookup(index_connection, ' '.join(args.text), args.by, args.limit):
+            print(f'({entry.pinyin} {entry.ideogram} {entry.translation})  {entry.path}:{entry.line}')
+        print(f'{(time.perf_counter() - start) * 1000:.1f} ms')
+    index_connection.close()
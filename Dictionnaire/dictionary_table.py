@@ -0,0 +1,166 @@
+# MIT License
+#
+# Copyright (c) 2023 ESUNA - Sourigna SIMMALAVONG
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import sys
+import time
+import tracemalloc
+from array import array
+from pathlib import Path
+
+from beartype import beartype
+from beartype.typing import List, Dict, Optional, Tuple, Iterable, Iterator
+
+import Dictionnaire.rulesets  # noqa: F401, makes tone_analysis importable
+from Dictionnaire.chinese_struct import ChineseStruct
+from Dictionnaire.generate_html_dictionary import split_parentheses, split_tokens, parse_lines, read_lines
+from tone_analysis import ToneAnalysis, analyze_pinyins
+
+
+# Row view over a DictionaryTable, usable wherever a ChineseStruct is expected (e.g. restructure).
+class DictionaryRow(ChineseStruct):
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table: 'DictionaryTable', index: int):
+        self.table: DictionaryTable = table
+        self.index: int = index
+
+    @property
+    def pinyin(self) -> str:
+        return self.table.strings[self.table.pinyins[self.index]]
+
+    @property
+    def ideogram(self) -> str:
+        return self.table.strings[self.table.ideograms[self.index]]
+
+    @property
+    def translation(self) -> str:
+        return self.table.strings[self.table.translations[self.index]]
+
+
+# Columnar storage of a whole dictionary: every column is an array of indices into a pool of interned strings,
+# so repeated pinyins, ideograms and translations are only stored once.
+# The lines of the source are kept (line_ends, blank_lines) so that the writers can render the same outputs.
+class DictionaryTable:
+    __slots__ = ('strings', 'string_ids', 'pinyins', 'ideograms', 'translations', 'line_ends', 'blank_lines')
+
+    @beartype
+    def __init__(self):
+        self.strings: List[str] = []
+        self.string_ids: Dict[str, int] = {}
+        self.pinyins: array = array('I')
+        self.ideograms: array = array('I')
+        self.translations: array = array('I')
+        self.line_ends: array = array('I')  # rows of line i: [line_ends[i - 1], line_ends[i])
+        self.blank_lines: Dict[int, str] = {}  # line index -> blank line, kept as it is
+
+    # intern and append are called for every entry: they are not wrapped by beartype.
+    def intern(self, string: str) -> int:
+        string_id: Optional[int] = self.string_ids.get(string)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.string_ids[string] = string_id
+            self.strings.append(sys.intern(string))
+        return string_id
+
+    def append(self, pinyin: str, ideogram: str, translation: str):
+        self.pinyins.append(self.intern(pinyin))
+        self.ideograms.append(self.intern(ideogram))
+        self.translations.append(self.intern(translation))
+
+    @beartype
+    def append_line(self, line: str):
+        if line.strip() == '':
+            self.blank_lines[len(self.line_ends)] = line
+        else:
+            for parenthesis in split_parentheses(line):
+                self.append(*split_tokens(parenthesis))
+        self.line_ends.append(len(self.pinyins))
+
+    @classmethod
+    @beartype
+    def from_lines(cls, lines: Iterable[str]) -> 'DictionaryTable':
+        table: DictionaryTable = cls()
+        for line in lines:
+            table.append_line(line)
+        return table
+
+    @classmethod
+    @beartype
+    def from_paths(cls, paths: List[Path]) -> 'DictionaryTable':
+        return cls.from_lines(read_lines(paths))
+
+    def __len__(self) -> int:
+        return len(self.pinyins)
+
+    @beartype
+    def __getitem__(self, index: int) -> DictionaryRow:
+        if not -len(self) <= index < len(self):
+            raise IndexError(index)
+        return DictionaryRow(self, index % len(self))
+
+    def __iter__(self) -> Iterator[DictionaryRow]:
+        return (DictionaryRow(self, index) for index in range(len(self)))
+
+    # Per-syllable tones of the pinyin column, row by row.
+    @beartype
+    def syllable_tones(self) -> ToneAnalysis:
+        return analyze_pinyins([self.strings[pinyin] for pinyin in self.pinyins])
+
+    # Same items as parse_lines, to feed render_lines or write_html_dictionaries directly.
+    @beartype
+    def parsed_lines(self) -> Iterator[Tuple[str, Optional[List[Tuple[ChineseStruct, str]]]]]:
+        start: int = 0
+        for line_index, end in enumerate(self.line_ends):
+            if line_index in self.blank_lines:
+                yield self.blank_lines[line_index], None
+            else:
+                rows: List[DictionaryRow] = [DictionaryRow(self, index) for index in range(start, end)]
+                yield '', [(row, row.translation) for row in rows]
+            start = end
+
+
+# Compares the memory and construction time of a DictionaryTable against lists of (ChineseStruct, translation).
+@beartype
+def measure(paths: List[Path]) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    for name, build in [('structs', lambda: list(parse_lines(read_lines(paths)))),
+                        ('table', lambda: DictionaryTable.from_paths(paths))]:
+        start: float = time.perf_counter()
+        build()
+        elapsed: float = time.perf_counter() - start
+        # Measured separately: tracemalloc slows the allocations down.
+        tracemalloc.start()
+        built = build()
+        current: int
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del built
+        results[name] = {'seconds': elapsed, 'memory_mb': current / 1e6}
+    return results
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print('Usage: python dictionary_table.py path_to_input_dictionary.md [...]')
+        raise Exception()
+    for name, result in measure([Path(arg) for arg in sys.argv[1:]]).items():
+        print(f"{name}: {result['memory_mb']:.2f} MB, {result['seconds']:.3f} s")
@@ -0,0 +1,240 @@
+# MIT License
+#
+# Copyright (c) 2023 ESUNA - Sourigna SIMMALAVONG
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import argparse
+import random
+import re
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+from beartype import beartype
+from beartype.typing import List, Dict, Optional, Tuple, NamedTuple, Pattern
+from numpy._typing import NDArray
+
+import Dictionnaire.rulesets  # noqa: F401, makes the regex-rulesets modules importable
+from Dictionnaire.dictionary_table import DictionaryTable
+from pinyin_converter import to_marks, tone_of_mark
+from tone_analysis import untone_table
+
+# Tone-insensitive fuzzy search of the dictionary pinyins: 'nihao', 'ni hao', 'níhao' or 'ni3hao' find 你好 (nǐhǎo).
+# Pinyins are keyed without tones (untone_table of tone_analysis, ü kept), separators and case.
+# The distinct keys are indexed by their bigrams (with ^ and $ as start and end): an edit changes at most
+# 2 bigrams, so a pinyin within an edit distance d of the query shares at least max(lengths) + 1 - 2 d bigrams with
+# it. The bigram counts of every pinyin are summed with numpy, and only the pinyins passing this count filter (and the
+# length filter) are compared with the query (Levenshtein distance, bounded).
+# Results are ranked by edit distance, then by tone differences with the query if it has tones, then by row.
+# A BK-tree was measured too: far slower to build (about 30 s for 100k pinyins) and to query in pure python.
+
+separators: Pattern = re.compile(r"[\s'’\-]+")
+tone_numbers: Pattern = re.compile('[0-5]')
+
+
+@beartype
+def fuzzy_key(pinyin: str) -> str:
+    # 'Nǐ hǎo', 'ni3 hao3', "xi'an", 'lǜ', 'lv4', 'nu:3' -> 'nihao', 'nihao', 'xian', 'lü', 'lü', 'nü'
+    return tone_numbers.sub('', separators.sub('', pinyin.translate(untone_table).lower())).replace('u:', 'ü') \
+        .replace('v', 'ü')
+
+
+@beartype
+def toned_pinyin(pinyin: str) -> str:
+    # 'Ni3 hao3', 'nǐ hǎo' -> 'nǐhǎo'
+    return separators.sub('', to_marks(pinyin, join=True).lower()).replace('u:', 'ü').replace('v', 'ü')
+
+
+# Called for every key: not wrapped by beartype.
+def bigrams(key: str) -> List[str]:
+    padded: str = f'^{key}$'
+    return [padded[index:index + 2] for index in range(len(padded) - 1)]
+
+
+# Called for every candidate: not wrapped by beartype.
+# Edit distance of a and b, or cap + 1 as soon as it is known to be larger than cap.
+def levenshtein(a: str, b: str, cap: int) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    if len(a) - len(b) > cap:
+        return cap + 1
+    previous: List[int] = list(range(len(b) + 1))
+    for i, a_character in enumerate(a, 1):
+        current: List[int] = [i]
+        for j, b_character in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a_character != b_character)))
+        if min(current) > cap:
+            return cap + 1
+        previous = current
+    return min(previous[-1], cap + 1)
+
+
+@beartype
+def default_max_distance(key: str) -> int:
+    # 1 edit up to 7 letters (about 2 syllables), then 1 more every 4 letters, at most 3
+    return min(3, max(1, len(key) // 4))
+
+
+class FuzzyMatch(NamedTuple):
+    pinyin: str
+    ideogram: str
+    translation: str
+    distance: int  # edit distance, tones ignored
+    tone_distance: int  # edit distance, tones included (0 if the query has no tones)
+    row: int
+
+
+class FuzzyPinyinIndex:
+    @beartype
+    def __init__(self, table: DictionaryTable):
+        self.table: DictionaryTable = table
+        key_ids: Dict[str, int] = {}
+        self.keys: List[str] = []
+        self.key_rows: List[List[int]] = []
+        for row, pinyin_id in enumerate(table.pinyins):
+            key: str = fuzzy_key(table.strings[pinyin_id])
+            key_id: Optional[int] = key_ids.get(key)
+            if key_id is None:
+                key_id = key_ids[key] = len(self.keys)
+                self.keys.append(key)
+                self.key_rows.append([])
+            self.key_rows[key_id].append(row)
+        # Keys having a bigram twice are listed twice: the counts never underestimate the shared bigrams.
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for key_id, key in enumerate(self.keys):
+            for bigram in bigrams(key):
+                postings[bigram].append(key_id)
+        self.postings: Dict[str, NDArray] = {bigram: np.array(key_ids, dtype=np.int32)
+                                             for bigram, key_ids in postings.items()}
+        self.lengths: NDArray = np.array([len(key) for key in self.keys], dtype=np.int32)
+
+    # Keys within max_distance of key, with their distance
+    @beartype
+    def find_keys(self, key: str, max_distance: int) -> List[Tuple[int, int]]:
+        query_postings: List[NDArray] = [self.postings[bigram] for bigram in set(bigrams(key))
+                                         if bigram in self.postings]
+        if not query_postings:
+            return []
+        shared: NDArray = np.bincount(np.concatenate(query_postings), minlength=len(self.keys))
+        candidates: NDArray = np.flatnonzero((shared >= np.maximum(self.lengths, len(key)) + 1 - 2 * max_distance) &
+                                             (np.abs(self.lengths - len(key)) <= max_distance))
+        found: List[Tuple[int, int]] = []
+        for key_id in candidates.tolist():
+            distance: int = levenshtein(key, self.keys[key_id], max_distance)
+            if distance <= max_distance:
+                found.append((key_id, distance))
+        return found
+
+    # Linear scan, the reference of find_keys
+    @beartype
+    def scan_keys(self, key: str, max_distance: int) -> List[Tuple[int, int]]:
+        return [(key_id, distance) for key_id, distance in
+                ((key_id, levenshtein(key, other, max_distance)) for key_id, other in enumerate(self.keys))
+                if distance <= max_distance]
+
+    @beartype
+    def search(self, query: str, max_distance: Optional[int] = None, limit: int = 20,
+               scan: bool = False) -> List[FuzzyMatch]:
+        key: str = fuzzy_key(query)
+        if not key:
+            return []
+        max_distance = default_max_distance(key) if max_distance is None else max_distance
+        found: List[Tuple[int, int]] = (self.scan_keys if scan else self.find_keys)(key, max_distance)
+        toned_query: str = toned_pinyin(query)
+        has_tones: bool = any(character in tone_of_mark for character in toned_query)
+        matches: List[FuzzyMatch] = []
+        for key_id, distance in found:
+            for row in self.key_rows[key_id]:
+                pinyin: str = self.table.strings[self.table.pinyins[row]]
+                tone_distance: int = levenshtein(toned_query, toned_pinyin(pinyin), len(toned_query) + len(pinyin)) \
+                    if has_tones else 0
+                matches.append(FuzzyMatch(pinyin, self.table.strings[self.table.ideograms[row]],
+                                          self.table.strings[self.table.translations[row]], distance, tone_distance,
+                                          row))
+        matches.sort(key=lambda match: (match.distance, match.tone_distance, match.row))
+        return matches[:limit]
+
+
+# Queries made from the dictionary pinyins, with up to 2 random edits
+@beartype
+def random_queries(index: FuzzyPinyinIndex, count: int, seed: int = 0) -> List[str]:
+    generator: random.Random = random.Random(seed)
+    letters: str = 'abcdefghijklmnopqrstuvwxyz'
+    queries: List[str] = []
+    for _ in range(count):
+        query: List[str] = list(index.table.strings[index.table.pinyins[generator.randrange(len(index.table))]])
+        for _ in range(generator.randint(0, 2)):
+            position: int = generator.randint(0, len(query))
+            edit: int = generator.randint(0, 2)
+            if edit == 0 or not query:
+                query.insert(position, generator.choice(letters))
+            elif edit == 1:
+                query[min(position, len(query) - 1)] = generator.choice(letters)
+            else:
+                del query[min(position, len(query) - 1)]
+        queries.append(''.join(query))
+    return queries
+
+
+if __name__ == '__main__':
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description='Tone-insensitive fuzzy search of the pinyins of (pinyin ideogram translation) dictionaries.')
+    parser.add_argument('inputs', type=Path, nargs='+', metavar='path_to_input_dictionary.md')
+    parser.add_argument('--query', action='append', default=[], help='pinyin, with or without tones (repeatable)')
+    parser.add_argument('--max-distance', type=int, help='edits allowed (default: 1 up to 7 letters, then more)')
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--check', type=int, metavar='N',
+                        help='compare the index with a linear scan on N random queries, exit 1 if they differ')
+    args: argparse.Namespace = parser.parse_args()
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    start: float = time.perf_counter()
+    index: FuzzyPinyinIndex = FuzzyPinyinIndex(DictionaryTable.from_paths(args.inputs))
+    print(f'{len(index.table)} entries, {len(index.keys)} distinct pinyins indexed in '
+          f'{time.perf_counter() - start:.3f} s')
+
+    for query in args.query:
+        start = time.perf_counter()
+        matches: List[FuzzyMatch] = index.search(query, args.max_distance, args.limit)
+        elapsed: float = time.perf_counter() - start
+        for match in matches:
+            print(f'({match.pinyin} {match.ideogram} {match.translation})  distance {match.distance}')
+        print(f'{query}: {len(matches)} result(s) in {elapsed * 1000:.1f} ms')
+
+    if args.check is not None:
+        index_seconds: float = 0.0
+        scan_seconds: float = 0.0
+        differences: int = 0
+        for query in random_queries(index, args.check):
+            start = time.perf_counter()
+            matches: List[FuzzyMatch] = index.search(query, args.max_distance, len(index.table))
+            index_seconds += time.perf_counter() - start
+            start = time.perf_counter()
+            scanned: List[FuzzyMatch] = index.search(query, args.max_distance, len(index.table), scan=True)
+            scan_seconds += time.perf_counter() - start
+            if matches != scanned:
+                differences += 1
+                print(f'{query}: {len(matches)} result(s) instead of {len(scanned)}')
+        print(f'{args.check} queries, {differences} different from the linear scan, '
+              f'index: {index_seconds / max(args.check, 1) * 1000:.2f} ms, '
+              f'scan: {scan_seconds / max(args.check, 1) * 1000:.2f} ms per query')
+        sys.exit(1 if differences else 0)
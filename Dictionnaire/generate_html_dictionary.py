@@ -20,16 +20,24 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import argparse
+import atexit
 import re
 import shutil
 import sys
+from contextlib import ExitStack
+from functools import lru_cache
+from io import StringIO, TextIOBase
+from itertools import islice
 from pathlib import Path
 
 from beartype import beartype
-from beartype.typing import List, Tuple, Dict
+from beartype.typing import List, Tuple, Dict, Optional, Union, Iterable, Iterator
 
 from Dictionnaire.chinese_struct import ChineseStruct
 from Dictionnaire.chinese_token import ChineseToken, is_valid_format
+from Dictionnaire.deduplicator import DedupMode, Deduplicator
+from Dictionnaire.pipeline_profiler import PipelineProfiler, check_cost, write_report
 
 
 # Grammar
@@ -44,8 +52,17 @@ from Dictionnaire.chinese_token import ChineseToken, is_valid_format
 # short_ideogram_first := (ideogram pinyin)
 # short_pinyin_first := (pinyin ideogram)
 
+layouts: Dict[str, List[ChineseToken]] = {
+    # Just to have the same file without the closing parenthesis.
+    'full_pinyin_first': [ChineseToken.pinyin, ChineseToken.ideogram, ChineseToken.translation],
+    'short_pinyin_first': [ChineseToken.pinyin, ChineseToken.ideogram],
+    'full_han_first': [ChineseToken.ideogram, ChineseToken.pinyin, ChineseToken.translation],
+    'short_han_first': [ChineseToken.ideogram, ChineseToken.pinyin],
+}
+stdio_path: Path = Path('-')
+
 @beartype
-def split(line: str) -> Tuple[ChineseStruct, str]:
+def split_tokens(line: str) -> Tuple[str, str, str]:
     line = line.strip()
     line = re.sub('\s+', ' ', line)
 
@@ -57,11 +74,18 @@ def split(line: str) -> Tuple[ChineseStruct, str]:
     if len(tokens) < 2:
         raise Exception(f'Invalid line, not enough tokens: {line}')
     elif len(tokens) == 2:  # only the pinyin and ideogram, no translation
-        return ChineseStruct(tokens[0], tokens[1]), ''
+        return tokens[0], tokens[1], ''
     else:  # len(tokens) >= 3
-        chinese_struct: ChineseStruct = ChineseStruct(tokens[0], tokens[1])
-        translation: str = ' '.join(tokens[2:])
-        return chinese_struct, translation
+        return tokens[0], tokens[1], ' '.join(tokens[2:])
+
+
+@beartype
+def split(line: str) -> Tuple[ChineseStruct, str]:
+    pinyin: str
+    ideogram: str
+    translation: str
+    pinyin, ideogram, translation = split_tokens(line)
+    return ChineseStruct(pinyin, ideogram), translation
 
 
 @beartype
@@ -86,75 +110,382 @@ def restructure(chinese_struct: ChineseStruct, translation: str, format: List[Ch
 
 
 @beartype
-def generate_html_dictionary(in_dict_path: Path, out_dict_path: Path, format: List[ChineseToken]):
-    if in_dict_path == out_dict_path:
-        raise Exception('in and out path should not be the same!')
-
-    out_lines: List[str] = []
-    with in_dict_path.open('r', encoding='utf-8') as in_dict_file:
-        lines: List[str] = in_dict_file.readlines()
-        for line in lines:
-            if line.strip() == '':
-                out_lines.append(line)
-                continue
-            parentheses: List[str] = line.split(')(')
-            if not parentheses:
-                raise Exception(f'invalid line: {parentheses}')
-            parentheses[0] = parentheses[0].replace('(', '')
-            parentheses[-1] = parentheses[-1].replace(')', '')
-            out_parentheses: List[str] = []
-            for parenthesis in parentheses:
-                chinese_struct: ChineseStruct
-                translation: str
-                chinese_struct, translation = split(parenthesis)
-                out_parentheses.append(restructure(chinese_struct, translation, format))
-            # [:-1]: do not take the closing parenthesis (autocompletion)
-            if out_parentheses[-1][-1] == ')':
-                out_lines.append(''.join(out_parentheses)[:-1])
-            else:
-                out_lines.append(''.join(out_parentheses))
-            # out_lines.append(''.join(out_parentheses))
+def split_parentheses(line: str) -> List[str]:
+    parentheses: List[str] = line.split(')(')
+    if not parentheses:
+        raise Exception(f'invalid line: {parentheses}')
+    parentheses[0] = parentheses[0].replace('(', '')
+    parentheses[-1] = parentheses[-1].replace(')', '')
+    return parentheses
 
+
+@beartype
+def parse_line(line: str) -> List[Tuple[ChineseStruct, str]]:
+    return [split(parenthesis) for parenthesis in split_parentheses(line)]
+
+
+@beartype
+def restructure_entries(entries: List[Tuple[ChineseStruct, str]], format: List[ChineseToken]) -> List[str]:
+    return [restructure(chinese_struct, translation, format) for chinese_struct, translation in entries]
+
+
+@beartype
+def deduplicate_entries(out_parentheses: List[str], deduplicator: Deduplicator) -> Optional[str]:
+    out_parentheses = deduplicator.filter_entries(out_parentheses)
+    if not out_parentheses:  # every entry of the line was a duplicate
+        return None
+    out_line: str = ''.join(out_parentheses)
+    # [:-1]: do not take the closing parenthesis (autocompletion)
+    if out_line[-1] == ')':
+        out_line = out_line[:-1]
     # Remove duplicates
-    for i, line in enumerate(out_lines):
-        if line.strip() != '':
-            while line in out_lines[i + 1:]:
-                index: int = out_lines[i + 1:].index(line) + i + 1
-                out_lines.pop(index)
+    if not deduplicator.keep_line(out_line):
+        return None
+    return out_line
+
+
+@beartype
+def render_line(entries: List[Tuple[ChineseStruct, str]], format: List[ChineseToken],
+                deduplicator: Deduplicator) -> Optional[str]:
+    return deduplicate_entries(restructure_entries(entries, format), deduplicator)
+
+
+@beartype
+def render_output_line(line: str, entries: Optional[List[Tuple[ChineseStruct, str]]], format: List[ChineseToken],
+                       deduplicator: Deduplicator) -> Optional[str]:
+    if entries is None:  # blank lines are kept as they are
+        return line.rstrip('\n') + '\n'
+    out_line: Optional[str] = render_line(entries, format, deduplicator)
+    return None if out_line is None else f'{out_line}\n'
+
+
+# Streaming pipeline: read_lines -> parse_lines -> render_lines -> BufferedLineWriter.
+# Only the current line is held in memory, besides the keys kept by the deduplicator.
+@beartype
+def read_lines(in_dict_paths: List[Path]) -> Iterator[str]:
+    for path in in_dict_paths:
+        if path == stdio_path:
+            yield from sys.stdin
+            continue
+        with path.open('r', encoding='utf-8') as in_dict_file:
+            yield from in_dict_file
+
+
+@beartype
+def parse_lines(lines: Iterable[str]) -> Iterator[Tuple[str, Optional[List[Tuple[ChineseStruct, str]]]]]:
+    for line in lines:
+        if line.strip() == '':
+            yield line, None
+        else:
+            yield line, parse_line(line)
+
+
+@beartype
+def render_lines(parsed_lines: Iterable[Tuple[str, Optional[List[Tuple[ChineseStruct, str]]]]],
+                 format: List[ChineseToken], deduplicator: Deduplicator) -> Iterator[str]:
+    for line, entries in parsed_lines:
+        out_line: Optional[str] = render_output_line(line, entries, format, deduplicator)
+        if out_line is not None:
+            yield out_line
+
+
+# Same as parse_lines, with the reading and the parsing timed by the profiler, a chunk of lines at a time.
+# Not decorated with @beartype: the checks of the generators would be counted in the stages of their consumers.
+def profile_parse_lines(lines: Iterable[str], profiler: PipelineProfiler,
+                        chunk_lines: int = 4096) -> Iterator[Tuple[str, Optional[List[Tuple[ChineseStruct, str]]]]]:
+    iterator: Iterator[str] = iter(lines)
+    while True:
+        previous: Optional[str] = profiler.switch('read')
+        chunk: List[str] = list(islice(iterator, chunk_lines))
+        profiler.switch('parse')
+        try:
+            parsed: List[Tuple[str, Optional[List[Tuple[ChineseStruct, str]]]]] = [
+                (line, None) if line.strip() == '' else (line, parse_line(line)) for line in chunk]
+        except Exception:
+            profiler.count('errors')
+            raise
+        profiler.switch(previous)
+        if not chunk:
+            return
+        yield from parsed
 
-    out_lines = [f'{out_line}\n' for out_line in out_lines]
-    out_lines = [re.sub('\n+', '\n', out_line) for out_line in out_lines]
 
-    with out_dict_path.open('w', encoding='utf-8') as out_dict_file:
-        out_dict_file.writelines(out_lines)
+# Per call cost of the @beartype checks of the pipeline functions, measured once on a sample line.
+# Profiled runs measure it with PipelineProfiler.calibrate, before the profiler starts.
+@lru_cache(maxsize=None)
+@beartype
+def check_costs() -> Dict[str, float]:
+    line: str = '(nǐ hǎo 你好 hello)(zài jiàn 再见 goodbye)'
+    parenthesis: str = split_parentheses(line)[0]
+    entries: List[Tuple[ChineseStruct, str]] = parse_line(line)
+    chinese_struct: ChineseStruct = entries[0][0]
+    format: List[ChineseToken] = layouts['full_pinyin_first']
+    out_parentheses: List[str] = restructure_entries(entries, format)
+    deduplicator: Deduplicator = Deduplicator()
+    return {
+        'parse_line': check_cost(parse_line, (line,)),
+        'split_parentheses': check_cost(split_parentheses, (line,)),
+        'split': check_cost(split, (parenthesis,)),
+        'split_tokens': check_cost(split_tokens, (parenthesis,)),
+        'ChineseStruct': check_cost(ChineseStruct.__init__, (chinese_struct, 'nǐhǎo', '你好')),
+        'restructure': check_cost(restructure, (chinese_struct, 'hello', format)),
+        'restructure_entries': check_cost(restructure_entries, (entries, format)),
+        'deduplicate_entries': check_cost(deduplicate_entries, (out_parentheses, deduplicator)),
+        'Deduplicator.filter_entries': check_cost(Deduplicator.filter_entries, (deduplicator, out_parentheses)),
+        'Deduplicator.keep_line': check_cost(Deduplicator.keep_line, (deduplicator, line)),
+        'Deduplicator.is_new': check_cost(Deduplicator.is_new, (deduplicator, line)),
+        'BufferedLineWriter.write': check_cost(BufferedLineWriter.write, (BufferedLineWriter(StringIO()), line)),
+    }
+
+
+class BufferedLineWriter:
+    @beartype
+    def __init__(self, file: TextIOBase, buffer_lines: int = 4096):
+        self.file: TextIOBase = file
+        self.buffer_lines: int = buffer_lines
+        self.buffer: List[str] = []
+
+    @beartype
+    def write(self, line: str):
+        self.buffer.append(line)
+        if len(self.buffer) >= self.buffer_lines:
+            self.flush()
+
+    @beartype
+    def flush(self):
+        self.file.writelines(self.buffer)
+        self.file.flush()
+        self.buffer.clear()
+
+
+# Same as the rendering loop of write_html_dictionaries, with the rendering, deduplication and writing timed by the
+# profiler, and the lines counted, a chunk of lines at a time.
+@beartype
+def write_profiled_lines(parsed_lines: Iterable[Tuple[str, Optional[List[Tuple[ChineseStruct, str]]]]],
+                         outputs: Dict[Path, List[ChineseToken]], deduplicators: Dict[Path, Deduplicator],
+                         writers: Dict[Path, BufferedLineWriter], profiler: PipelineProfiler, chunk_lines: int = 4096):
+    costs: Dict[str, float] = check_costs()
+    iterator: Iterator[Tuple[str, Optional[List[Tuple[ChineseStruct, str]]]]] = iter(parsed_lines)
+    previous: Optional[str] = profiler.switch('parse')
+    while chunk := list(islice(iterator, chunk_lines)):
+        entry_lines: int = sum(entries is not None for _, entries in chunk)
+        entries_count: int = sum(len(entries) for _, entries in chunk if entries is not None)
+        profiler.count('lines', len(chunk))
+        profiler.count('blank_lines', len(chunk) - entry_lines)
+        profiler.count('entry_lines', entry_lines)
+        profiler.count('entries', entries_count)
+        for function in ['parse_line', 'split_parentheses']:
+            profiler.check(function, entry_lines, costs[function])
+        for function in ['split', 'split_tokens', 'ChineseStruct']:
+            profiler.check(function, entries_count, costs[function])
+        for out_dict_path, format in outputs.items():
+            deduplicator: Deduplicator = deduplicators[out_dict_path]
+            duplicates_before: int = deduplicator.duplicates
+            profiler.switch('render')
+            rendered: List[Optional[List[str]]] = [None if entries is None else restructure_entries(entries, format)
+                                                   for _, entries in chunk]
+            profiler.switch('dedup')
+            out_lines: List[Optional[str]] = []
+            for (line, _), out_parentheses in zip(chunk, rendered):
+                if out_parentheses is None:  # blank lines are kept as they are
+                    out_lines.append(line.rstrip('\n') + '\n')
+                else:
+                    out_line: Optional[str] = deduplicate_entries(out_parentheses, deduplicator)
+                    out_lines.append(None if out_line is None else f'{out_line}\n')
+            profiler.switch('write')
+            writer: BufferedLineWriter = writers[out_dict_path]
+            written: int = 0
+            for out_line in out_lines:
+                if out_line is not None:
+                    writer.write(out_line)
+                    written += 1
+            profiler.switch('parse')
+            profiler.count('out_lines', written)
+            profiler.count('duplicates', deduplicator.duplicates - duplicates_before)
+            profiler.check('restructure', entries_count, costs['restructure'])
+            for function in ['restructure_entries', 'deduplicate_entries', 'Deduplicator.filter_entries',
+                             'Deduplicator.keep_line']:
+                profiler.check(function, entry_lines, costs[function])
+            is_new_calls: int = entries_count if deduplicator.mode == DedupMode.entry else entry_lines
+            profiler.check('Deduplicator.is_new', is_new_calls, costs['Deduplicator.is_new'])
+            profiler.check('BufferedLineWriter.write', written, costs['BufferedLineWriter.write'])
+    profiler.switch('write')
+    for writer in writers.values():
+        writer.flush()
+    profiler.switch(previous)
+
+
+# Each line is parsed once (e.g. by parse_lines), then rendered into every output format.
+# Outputs are written to temporary files and only replace (or, when appending, are appended to) the previous outputs
+# once the whole input is parsed.
+@beartype
+def write_html_dictionaries(parsed_lines: Iterable[Tuple[str, Optional[List[Tuple[ChineseStruct, str]]]]],
+                            outputs: Dict[Path, List[ChineseToken]],
+                            deduplicators: Dict[Path, Deduplicator], append: bool = False,
+                            profiler: Optional[PipelineProfiler] = None):
+    tmp_paths: Dict[Path, Path] = {out_dict_path: out_dict_path.with_name(f'{out_dict_path.name}.tmp')
+                                   for out_dict_path in outputs}
+    try:
+        with ExitStack() as stack:
+            writers: Dict[Path, BufferedLineWriter] = {
+                out_dict_path: BufferedLineWriter(stack.enter_context(tmp_path.open('w', encoding='utf-8')))
+                for out_dict_path, tmp_path in tmp_paths.items()}
+            if profiler is not None:
+                write_profiled_lines(parsed_lines, outputs, deduplicators, writers, profiler)
+            else:
+                for line, entries in parsed_lines:
+                    for out_dict_path, format in outputs.items():
+                        out_line: Optional[str] = render_output_line(line, entries, format,
+                                                                     deduplicators[out_dict_path])
+                        if out_line is not None:
+                            writers[out_dict_path].write(out_line)
+            for writer in writers.values():
+                writer.flush()
+        previous: Optional[str] = profiler.switch('write') if profiler is not None else None
+        for out_dict_path, tmp_path in tmp_paths.items():
+            if append:
+                with tmp_path.open('rb') as tmp_file, out_dict_path.open('ab') as out_dict_file:
+                    shutil.copyfileobj(tmp_file, out_dict_file)
+            else:
+                tmp_path.replace(out_dict_path)
+        if profiler is not None:
+            profiler.switch(previous)
+    finally:
+        for tmp_path in tmp_paths.values():
+            tmp_path.unlink(missing_ok=True)
+
+
+@beartype
+def generate_html_dictionaries(in_dict_path: Union[Path, List[Path]], outputs: Dict[Path, List[ChineseToken]],
+                               deduplicators: Optional[Dict[Path, Deduplicator]] = None,
+                               profiler: Optional[PipelineProfiler] = None) -> Dict[Path, int]:
+    # Several input paths are merged into the same outputs, deduplicated across all of them.
+    in_dict_paths: List[Path] = in_dict_path if isinstance(in_dict_path, list) else [in_dict_path]
+    for out_dict_path, format in outputs.items():
+        if out_dict_path in in_dict_paths:
+            raise Exception('in and out path should not be the same!')
+        if not is_valid_format(format):
+            raise Exception(f'Invalid format: {format}')
+    if deduplicators is None:
+        deduplicators = {}
+    deduplicators = {out_dict_path: deduplicators.get(out_dict_path) or Deduplicator() for out_dict_path in outputs}
+    duplicates_before: Dict[Path, int] = {out_dict_path: deduplicator.duplicates
+                                          for out_dict_path, deduplicator in deduplicators.items()}
+
+    if profiler is not None:
+        write_html_dictionaries(profile_parse_lines(read_lines(in_dict_paths), profiler), outputs, deduplicators,
+                                profiler=profiler)
+    else:
+        write_html_dictionaries(parse_lines(read_lines(in_dict_paths)), outputs, deduplicators)
+
+    return {out_dict_path: deduplicator.duplicates - duplicates_before[out_dict_path]
+            for out_dict_path, deduplicator in deduplicators.items()}
+
+
+@beartype
+def generate_html_dictionary(in_dict_path: Union[Path, List[Path]], out_dict_path: Path, format: List[ChineseToken],
+                             deduplicator: Optional[Deduplicator] = None) -> int:
+    deduplicators: Dict[Path, Deduplicator] = {out_dict_path: deduplicator} if deduplicator is not None else {}
+    return generate_html_dictionaries(in_dict_path, {out_dict_path: format}, deduplicators)[out_dict_path]
+
+
+@beartype
+def make_output_formats(src: Path, out_dir: Path) -> Dict[Path, List[ChineseToken]]:
+    return {out_dir.joinpath(Path(f'{src.stem}_{layout}{src.suffix}')): format for layout, format in layouts.items()}
 
 
 if __name__ == '__main__':
-    if len(sys.argv) != 3:
-        print('Usage: python generate_html_dictionary.py path_to_input_dictionary.md output_dir')
-        raise Exception()
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description='Generate the html dictionaries from (pinyin ideogram translation) dictionaries.')
+    parser.add_argument('inputs', type=Path, nargs='+', metavar='path_to_input_dictionary.md',
+                        help='several inputs are merged and deduplicated into the same outputs, - reads stdin')
+    parser.add_argument('out_dir', type=Path, metavar='output_dir',
+                        help='- writes the layout selected with --layout to stdout')
+    parser.add_argument('--dedup', choices=[mode.name for mode in DedupMode], default=DedupMode.line.name,
+                        help='remove duplicated lines (default) or duplicated (parenthesis) entries')
+    parser.add_argument('--layout', choices=list(layouts), default='full_pinyin_first',
+                        help='layout written to stdout')
+    parser.add_argument('--force', action='store_true',
+                        help='rebuild the outputs even if the manifest says they are up to date')
+    parser.add_argument('--index', type=Path, metavar='index.sqlite',
+                        help='also update the SQLite lookup index of the inputs (see dictionary_index.py)')
+    parser.add_argument('--profile', type=Path, metavar='report.json',
+                        help='write the time spent in each stage, the counters and the peak memory of the run as JSON')
+    parser.add_argument('--profile-memory', action='store_true',
+                        help='also trace the peak of the python allocations (slower) in the --profile report')
+    args: argparse.Namespace = parser.parse_args()
 
-    src: Path = Path(sys.argv[1])
-    out_dir: Path = Path(sys.argv[2])
+    srcs: List[Path] = args.inputs
+    src: Path = srcs[0]
+    out_dir: Path = args.out_dir
+    sys.stdin.reconfigure(encoding='utf-8')
+    sys.stdout.reconfigure(encoding='utf-8')
 
-    # Local backup, just in case
-    shutil.copyfile(src, src.name)
+    if args.index is not None:
+        # Imported here: the index module itself imports this module.
+        from Dictionnaire.dictionary_index import open_index, update_index
+
+        index_connection = open_index(args.index)
+        for path, count in update_index(index_connection, [path for path in srcs if path != stdio_path]).items():
+            print(f'{path}: {count} entries indexed', file=sys.stderr)
+        index_connection.close()
+
+    profiler: Optional[PipelineProfiler] = None
+    if args.profile is not None:
+        profiler = PipelineProfiler(args.profile_memory)
+
+        # Registered with atexit: the report is also written when the run exits early, or fails (see 'errors').
+        def save_profile():
+            profiler.stop()
+            write_report(args.profile, profiler.report())
+            print(f'{args.profile}: profile written', file=sys.stderr)
+
+        profiler.calibrate(check_costs)
+        profiler.start()
+        atexit.register(save_profile)
+
+    if out_dir == stdio_path:
+        stdout_writer: BufferedLineWriter = BufferedLineWriter(sys.stdout, buffer_lines=256)
+        if profiler is not None:
+            write_profiled_lines(profile_parse_lines(read_lines(srcs), profiler), {stdio_path: layouts[args.layout]},
+                                 {stdio_path: Deduplicator(DedupMode[args.dedup])}, {stdio_path: stdout_writer},
+                                 profiler)
+            sys.exit(0)
+        for out_line in render_lines(parse_lines(read_lines(srcs)), layouts[args.layout],
+                                     Deduplicator(DedupMode[args.dedup])):
+            stdout_writer.write(out_line)
+        stdout_writer.flush()
+        sys.exit(0)
 
     if not out_dir.is_dir():
         raise Exception(f'argument is not a dir: {out_dir}')
 
-    formats: Dict[Path, List[ChineseToken]] = {
-        # Just to have the same file without the closing parenthesis.
-        out_dir.joinpath(Path(f'{src.stem}_full_pinyin_first{src.suffix}')): [ChineseToken.pinyin,
-                                                                              ChineseToken.ideogram,
-                                                                              ChineseToken.translation],
-        out_dir.joinpath(Path(f'{src.stem}_short_pinyin_first{src.suffix}')): [ChineseToken.pinyin,
-                                                                               ChineseToken.ideogram],
-        out_dir.joinpath(Path(f'{src.stem}_full_han_first{src.suffix}')): [ChineseToken.ideogram,
-                                                                           ChineseToken.pinyin,
-                                                                           ChineseToken.translation],
-        out_dir.joinpath(Path(f'{src.stem}_short_han_first{src.suffix}')): [ChineseToken.ideogram,
-                                                                            ChineseToken.pinyin],
-    }
-    for path_out, format in formats.items():
-        generate_html_dictionary(src, path_out, format)
+    formats: Dict[Path, List[ChineseToken]] = make_output_formats(src if src != stdio_path else Path('stdin.md'),
+                                                                  out_dir)
+
+    if len(srcs) == 1 and src != stdio_path:
+        # Imported here: the manifest module itself imports this module.
+        from Dictionnaire.manifest import Manifest, BuildStatus, manifest_name, update_html_dictionaries
+
+        manifest: Manifest = Manifest(out_dir.joinpath(manifest_name))
+        key: str = str(src.resolve())
+        status: BuildStatus
+        duplicates: Dict[Path, int]
+        status, duplicates, manifest.entries[key] = update_html_dictionaries(
+            src, formats, None if args.force else manifest.entries.get(key), DedupMode[args.dedup], profiler)
+        manifest.save()
+        print(f'{src}: {status.name}')
+        if status == BuildStatus.skipped:
+            sys.exit(0)
+        # Local backup, just in case
+        shutil.copyfile(src, src.name)
+    else:
+        # Local backup, just in case
+        for path in srcs:
+            if path != stdio_path:
+                shutil.copyfile(path, path.name)
+        deduplicators: Dict[Path, Deduplicator] = {path_out: Deduplicator(DedupMode[args.dedup])
+                                                   for path_out in formats}
+        duplicates: Dict[Path, int] = generate_html_dictionaries(srcs, formats, deduplicators, profiler)
+    for path_out, path_duplicates in duplicates.items():
+        print(f'{path_out}: {path_duplicates} duplicate(s) removed')
@@ -0,0 +1,269 @@
+# MIT License
+#
+# Copyright (c) 2023 ESUNA - Sourigna SIMMALAVONG
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import argparse
+import asyncio
+import json
+import sqlite3
+import sys
+import time
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+
+from beartype import beartype
+from beartype.typing import List, Dict, Set, Optional, Tuple, Any, Deque, Callable
+
+import Dictionnaire.rulesets  # noqa: F401, makes the regex-rulesets modules importable
+from Dictionnaire.dictionary_index import open_index, update_index, lookup
+from chinese_tone_renderer import render
+from pinyin_converter import to_marks, to_numbers
+
+# Local lookup service: the dictionaries are indexed once (see dictionary_index.py, in memory by default) and the
+# modules imported once, so that scripts (e.g. obsidian ones) get answers in well under a millisecond.
+# Minimal HTTP/1.1 with keep-alive, on localhost or on a unix socket:
+#   POST /       a JSON request, or a list of requests (batch) answered by a list in the same order:
+#                {"op": "lookup", "text": "nihao", "by": "auto", "limit": 20} -> {"result": [{"pinyin": ...}, ...]}
+#                {"op": "render", "text": "(你 nǐ you)", "compact": false} -> {"result": "<span ...>"}
+#                {"op": "pinyin", "text": "ni3 hao3", "to": "marks", "join": true} -> {"result": "nǐhǎo"}
+#                {"op": "pinyin", "text": "nǐ hǎo", "to": "numbers", "umlaut": "v", "separator": " "}
+#                {"op": "reload"}  reindexes the changed dictionaries (in a thread, the other requests wait for it)
+#                                  and clears the cache
+#                a failed request is answered by {"error": "..."}, without failing the rest of the batch
+#   GET /stats   request counts, cache hits and latency percentiles
+# Answers are cached (LRU) as encoded JSON, keyed by the canonical JSON of the request.
+# Only local scripts are served, not web pages: requests with an Origin header (sent by browsers) are refused, POST
+# requests should be 'Content-Type: application/json' (which a page cannot send without CORS preflight) and on TCP the
+# Host header should be the local address (against DNS rebinding).
+
+max_body_size: int = 16 << 20
+max_batch_size: int = 10000
+reasons: Dict[int, str] = {200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found',
+                           405: 'Method Not Allowed', 413: 'Payload Too Large', 415: 'Unsupported Media Type'}
+
+
+class ServiceStats:
+    @beartype
+    def __init__(self):
+        self.started: float = time.perf_counter()
+        self.http_requests: int = 0
+        self.requests: int = 0  # requests of the batches included
+        self.batches: int = 0
+        self.errors: int = 0
+        self.latencies: Deque[float] = deque(maxlen=10000)  # seconds from the request read to the response written
+
+    @beartype
+    def percentile(self, fraction: float) -> float:
+        if not self.latencies:
+            return 0.0
+        latencies: List[float] = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+    @beartype
+    def report(self) -> Dict[str, Any]:
+        return {
+            'uptime_s': round(time.perf_counter() - self.started, 3),
+            'http_requests': self.http_requests,
+            'requests': self.requests,
+            'batches': self.batches,
+            'errors': self.errors,
+            'latency_ms': {name: round(self.percentile(fraction) * 1000, 3)
+                           for name, fraction in [('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1.0)]},
+        }
+
+
+class LookupService:
+    @beartype
+    def __init__(self, srcs: List[Path], index_path: Path = Path(':memory:'), cache_size: int = 4096,
+                 log: Callable[[str], None] = print):
+        self.srcs: List[Path] = srcs
+        self.log: Callable[[str], None] = log
+        self.stats: ServiceStats = ServiceStats()
+        # Also used by the reload thread (see handle)
+        self.connection: sqlite3.Connection = open_index(index_path, check_same_thread=False)
+        self.reload()
+        self.cached_answer: Callable[[str], str] = lru_cache(maxsize=cache_size)(self.answer)
+        self.allowed_hosts: Optional[Set[str]] = None  # any Host header, unless serve listens on TCP
+        self.reload_lock: Optional[asyncio.Lock] = None  # held while a reload runs, created by serve
+
+    @beartype
+    def reload(self) -> Dict[str, int]:
+        start: float = time.perf_counter()
+        indexed: Dict[str, int] = {str(path): count for path, count in update_index(self.connection, self.srcs).items()}
+        for path, count in indexed.items():
+            self.log(f'{path}: {count} entries indexed')
+        self.log(f'index up to date in {time.perf_counter() - start:.3f} s')
+        return indexed
+
+    @beartype
+    def execute(self, request: Dict[str, Any]) -> Any:
+        op: Any = request.get('op')
+        if op == 'reload':
+            indexed: Dict[str, int] = self.reload()
+            self.cached_answer.cache_clear()
+            return indexed
+        if op not in ['lookup', 'render', 'pinyin']:
+            raise Exception(f'unknown op: {op!r}')
+        text: Any = request.get('text')
+        if not isinstance(text, str):
+            raise Exception(f'text should be a string: {text!r}')
+        if op == 'lookup':
+            return [entry._asdict() for entry in lookup(self.connection, text, request.get('by', 'auto'),
+                                                         request.get('limit', 20))]
+        elif op == 'render':
+            return render(text, request.get('compact', False))
+        else:  # pinyin
+            to: Any = request.get('to', 'marks')
+            if to == 'marks':
+                return to_marks(text, request.get('join', False))
+            elif to == 'numbers':
+                return to_numbers(text, request.get('umlaut', 'u:'), request.get('separator', ''))
+            raise Exception(f'unknown pinyin conversion: {to!r}')
+
+    # Called for every request, cached: not wrapped by beartype.
+    # Returns the encoded JSON answer.
+    def answer(self, key: str) -> str:
+        try:
+            return json.dumps({'result': self.execute(json.loads(key))}, ensure_ascii=False)
+        except Exception as exception:
+            return json.dumps({'error': f'{type(exception).__name__}: {exception}'}, ensure_ascii=False)
+
+    # Not wrapped by beartype: called for every request.
+    def answer_request(self, request: Any) -> str:
+        self.stats.requests += 1
+        if not isinstance(request, dict):
+            self.stats.errors += 1
+            return json.dumps({'error': f'a request should be an object: {request!r}'}, ensure_ascii=False)
+        if request.get('op') == 'reload':  # never cached
+            return self.answer(json.dumps(request))
+        answer: str = self.cached_answer(json.dumps(request, ensure_ascii=False, sort_keys=True))
+        if answer.startswith('{"error"'):
+            self.stats.errors += 1
+        return answer
+
+    # Status and JSON body of an HTTP request, headers names in lower case
+    @beartype
+    def respond(self, method: str, path: str, headers: Dict[str, str], body: bytes) -> Tuple[int, str]:
+        if 'origin' in headers:
+            return 403, json.dumps({'error': 'requests from web pages are not served'})
+        if self.allowed_hosts is not None and headers.get('host', '').lower() not in self.allowed_hosts:
+            return 403, json.dumps({'error': f"unexpected host: {headers.get('host', '')}"})
+        if path == '/stats':
+            cache = self.cached_answer.cache_info()
+            return 200, json.dumps({**self.stats.report(), 'cache': {'hits': cache.hits, 'misses': cache.misses,
+                                                                     'size': cache.currsize}})
+        if path != '/':
+            return 404, json.dumps({'error': f'unknown path: {path}'})
+        if method != 'POST':
+            return 405, json.dumps({'error': 'POST the JSON requests to /'})
+        if headers.get('content-type', '').split(';', 1)[0].strip().lower() != 'application/json':
+            return 415, json.dumps({'error': 'the requests should be sent as Content-Type: application/json'})
+        try:
+            requests: Any = json.loads(body)
+        except ValueError as exception:
+            return 400, json.dumps({'error': f'invalid JSON: {exception}'})
+        if isinstance(requests, list):
+            if len(requests) > max_batch_size:
+                return 413, json.dumps({'error': f'more than {max_batch_size} requests in the batch'})
+            self.stats.batches += 1
+            return 200, f"[{','.join(self.answer_request(request) for request in requests)}]"
+        return 200, self.answer_request(requests)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while request_line := await reader.readline():
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers: Dict[str, str] = {}
+                while (line := await reader.readline()).strip():
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length: int = int(headers.get('content-length', '0'))
+                start: float = time.perf_counter()
+                self.stats.http_requests += 1
+                if length > max_body_size:
+                    status, payload = 413, json.dumps({'error': f'body larger than {max_body_size} bytes'})
+                    keep_alive: bool = False
+                else:
+                    body: bytes = await reader.readexactly(length) if length else b''
+                    start = time.perf_counter()
+                    path: str = target.split('?', 1)[0]
+                    if path == '/' and (self.reload_lock.locked() or b'reload' in body):
+                        # Reindexing can take seconds: run in a thread, without blocking the event loop
+                        async with self.reload_lock:
+                            status, payload = await asyncio.get_running_loop().run_in_executor(
+                                None, self.respond, method, path, headers, body)
+                    else:
+                        status, payload = self.respond(method, path, headers, body)
+                    keep_alive: bool = headers.get('connection', '').lower() != 'close'
+                data: bytes = payload.encode('utf-8')
+                writer.write(f"HTTP/1.1 {status} {reasons[status]}\r\nContent-Type: application/json; charset=utf-8\r\n"
+                             f"Content-Length: {len(data)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}"
+                             f"\r\n\r\n".encode('latin-1') + data)
+                await writer.drain()
+                self.stats.latencies.append(time.perf_counter() - start)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # client gone, or not speaking HTTP
+        finally:
+            writer.close()
+
+    async def print_stats(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self.log(json.dumps(self.stats.report()))
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8765, unix_socket: Optional[Path] = None,
+                    stats_interval: float = 60.0):
+        self.reload_lock = asyncio.Lock()
+        if unix_socket is not None:
+            server: asyncio.AbstractServer = await asyncio.start_unix_server(self.handle, path=str(unix_socket))
+            self.log(f'listening on {unix_socket}')
+        else:
+            server: asyncio.AbstractServer = await asyncio.start_server(self.handle, host, port)
+            address: str = f'[{host}]' if ':' in host else host
+            self.allowed_hosts = {f'{name}:{port}' for name in [address.lower(), 'localhost', '127.0.0.1', '[::1]']}
+            self.log(f'listening on http://{host}:{port}/')
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.print_stats(stats_interval))
+
+
+if __name__ == '__main__':
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description='Serve dictionary lookups, tone rendering and pinyin conversions over local HTTP.')
+    parser.add_argument('inputs', type=Path, nargs='+', metavar='path_to_input_dictionary.md')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix-socket', type=Path, help='listen on this unix socket instead of --host and --port')
+    parser.add_argument('--index', type=Path, default=Path(':memory:'), metavar='index.sqlite',
+                        help='keep the index in this file: only the changed dictionaries are reindexed at start')
+    parser.add_argument('--cache-size', type=int, default=4096, help='answers kept in the LRU cache')
+    parser.add_argument('--stats-interval', type=float, default=60.0, help='seconds between two stats reports')
+    args: argparse.Namespace = parser.parse_args()
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    service: LookupService = LookupService(args.inputs, args.index, args.cache_size,
+                                           lambda message: print(message, flush=True))
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.unix_socket, args.stats_interval))
+    except KeyboardInterrupt:
+        print(json.dumps(service.stats.report()))
@@ -0,0 +1,156 @@
+# MIT License
+#
+# Copyright (c) 2023 ESUNA - Sourigna SIMMALAVONG
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import hashlib
+import json
+import os
+from enum import Enum, auto
+from functools import lru_cache
+from io import TextIOWrapper
+from pathlib import Path
+
+from beartype import beartype
+from beartype.typing import List, Dict, Optional, Tuple, Any
+
+from Dictionnaire.chinese_token import ChineseToken
+from Dictionnaire.deduplicator import DedupMode, Deduplicator
+from Dictionnaire.generate_html_dictionary import parse_lines, profile_parse_lines, write_html_dictionaries
+from Dictionnaire.pipeline_profiler import PipelineProfiler
+
+manifest_name: str = '.dictionary_manifest.json'
+# Any change to the code producing the dictionaries invalidates the manifest.
+tool_modules: List[str] = ['chinese_struct.py', 'chinese_token.py', 'deduplicator.py', 'generate_html_dictionary.py',
+                           'manifest.py', 'pipeline_profiler.py']
+hash_chunk_size: int = 1 << 20
+
+
+class BuildStatus(Enum):
+    skipped = auto(),  # source, formats and outputs unchanged
+    appended = auto(),  # only the lines appended to the source were processed
+    rebuilt = auto(),
+
+
+@lru_cache(maxsize=None)
+@beartype
+def tool_version() -> str:
+    digest = hashlib.sha256()
+    for module in tool_modules:
+        digest.update(Path(__file__).with_name(module).read_bytes())
+    return digest.hexdigest()
+
+
+# Returns the hash of the whole file, its size, the hash of its first prefix_size bytes and whether it ends with a new line.
+@beartype
+def hash_source(path: Path, prefix_size: int = 0) -> Tuple[str, int, Optional[str], bool]:
+    digest = hashlib.sha256()
+    prefix_hash: Optional[str] = None
+    size: int = 0
+    last_byte: bytes = b''
+    with path.open('rb') as file:
+        while chunk := file.read(hash_chunk_size):
+            if size < prefix_size <= size + len(chunk):
+                prefix_digest = digest.copy()
+                prefix_digest.update(chunk[:prefix_size - size])
+                prefix_hash = prefix_digest.hexdigest()
+            digest.update(chunk)
+            size += len(chunk)
+            last_byte = chunk[-1:]
+    if prefix_size == 0:
+        prefix_hash = hashlib.sha256().hexdigest()
+    return digest.hexdigest(), size, prefix_hash, last_byte == b'\n'
+
+
+@beartype
+def stat_output(path: Path) -> Optional[List[int]]:
+    if not path.is_file():
+        return None
+    stat: os.stat_result = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class Manifest:
+    @beartype
+    def __init__(self, path: Path):
+        self.path: Path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if path.is_file():
+            data: Dict[str, Any] = json.loads(path.read_text(encoding='utf-8'))
+            if data.get('tool_version') == tool_version():
+                self.entries = data['entries']
+
+    @beartype
+    def save(self):
+        tmp_path: Path = self.path.with_name(f'{self.path.name}.tmp')
+        tmp_path.write_text(json.dumps({'tool_version': tool_version(), 'entries': self.entries}, ensure_ascii=False,
+                                       indent=1, sort_keys=True), encoding='utf-8')
+        tmp_path.replace(self.path)
+
+
+# Regenerates the outputs of src only if needed, given its previous manifest entry.
+# Returns the build status, the duplicates removed by this run and the new manifest entry.
+@beartype
+def update_html_dictionaries(src: Path, outputs: Dict[Path, List[ChineseToken]], entry: Optional[Dict[str, Any]],
+                             dedup: DedupMode = DedupMode.line, profiler: Optional[PipelineProfiler] = None
+                             ) -> Tuple[BuildStatus, Dict[Path, int], Dict[str, Any]]:
+    formats: Dict[str, List[str]] = {str(out_dict_path): [token.name for token in format]
+                                     for out_dict_path, format in outputs.items()}
+    reusable: bool = entry is not None and entry['dedup'] == dedup.name and entry['formats'] == formats and \
+        all(entry['outputs'].get(str(out_dict_path)) == stat_output(out_dict_path) for out_dict_path in outputs)
+    old_size: int = entry['size'] if reusable else 0
+
+    src_hash: str
+    size: int
+    prefix_hash: Optional[str]
+    newline_end: bool
+    src_hash, size, prefix_hash, newline_end = hash_source(src, old_size)
+
+    deduplicators: Dict[Path, Deduplicator] = {out_dict_path: Deduplicator(dedup) for out_dict_path in outputs}
+    if reusable and src_hash == entry['hash']:
+        status: BuildStatus = BuildStatus.skipped
+    elif reusable and size > old_size and prefix_hash == entry['hash'] and entry['newline_end']:
+        # Appended-only source: restore the deduplication state from the outputs and process the new lines only.
+        status: BuildStatus = BuildStatus.appended
+        for out_dict_path, deduplicator in deduplicators.items():
+            with out_dict_path.open('r', encoding='utf-8') as out_dict_file:
+                deduplicator.seed(out_dict_file)
+        with src.open('rb') as src_file:
+            src_file.seek(old_size)
+            lines: TextIOWrapper = TextIOWrapper(src_file, encoding='utf-8')
+            write_html_dictionaries(parse_lines(lines) if profiler is None else profile_parse_lines(lines, profiler),
+                                    outputs, deduplicators, append=True, profiler=profiler)
+    else:
+        status: BuildStatus = BuildStatus.rebuilt
+        with src.open('r', encoding='utf-8') as src_file:
+            write_html_dictionaries(
+                parse_lines(src_file) if profiler is None else profile_parse_lines(src_file, profiler), outputs,
+                deduplicators, profiler=profiler)
+
+    new_entry: Dict[str, Any] = {
+        'hash': src_hash,
+        'size': size,
+        'newline_end': newline_end,
+        'dedup': dedup.name,
+        'formats': formats,
+        'outputs': {str(out_dict_path): stat_output(out_dict_path) for out_dict_path in outputs},
+    }
+    return status, {out_dict_path: deduplicator.duplicates for out_dict_path, deduplicator in deduplicators.items()}, \
+        new_entry
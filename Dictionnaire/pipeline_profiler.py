@@ -0,0 +1,202 @@
+# MIT License
+#
+# Copyright (c) 2023 ESUNA - Sourigna SIMMALAVONG
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import json
+import statistics
+import sys
+import time
+import timeit
+import tracemalloc
+from pathlib import Path
+
+from beartype import beartype
+from beartype.typing import List, Dict, Optional, Tuple, Callable, Any
+
+try:
+    import resource
+except ImportError:  # not available on windows
+    resource = None
+
+# Instrumentation of the dictionary pipeline (see generate_html_dictionary.py):
+# - wall and cpu time of each stage, exclusive: the time is charged to the current stage only,
+# - counters of the lines, blank lines, lines of entries, entries, written lines, duplicates and errors,
+# - the estimated time spent in the @beartype checks of the pipeline functions, and the time taken to measure their
+#   cost (calibration, before the run and outside of its time),
+# - the peak memory of the process (and of the python allocations with trace_memory).
+# The stages are switched once per chunk of lines, not once per line, so that profiling barely slows the run down.
+# Reports are plain dicts (JSON), merged by batch drivers; hooks are called with every merged or published report.
+
+stage_names: List[str] = ['read', 'parse', 'render', 'dedup', 'write']
+counter_names: List[str] = ['lines', 'blank_lines', 'entry_lines', 'entries', 'out_lines', 'duplicates', 'errors']
+other_stage: str = 'other'  # time spent outside of the stages, e.g. hashing the sources for the manifest
+
+ProfileHook = Callable[[str, Dict[str, Any]], None]
+
+
+# Time per call of the checks added by @beartype: the checked function against the undecorated one (__wrapped__).
+# The inner calls are checked in both cases, so the difference only counts the outer decorator. Both are timed in turn
+# and the median difference is kept, the timings of the slower functions being noisier than the checks themselves.
+@beartype
+def check_cost(function: Callable, args: Tuple, number: int = 100, repeat: int = 5) -> float:
+    differences: List[float] = []
+    for _ in range(repeat):
+        checked: float = timeit.timeit(lambda: function(*args), number=number)
+        unchecked: float = timeit.timeit(lambda: function.__wrapped__(*args), number=number)
+        differences.append(checked - unchecked)
+    return max(0.0, statistics.median(differences) / number)
+
+
+class PipelineProfiler:
+    @beartype
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory: bool = trace_memory
+        self.wall: Dict[str, float] = dict.fromkeys(stage_names, 0.0)
+        self.cpu: Dict[str, float] = dict.fromkeys(stage_names, 0.0)
+        self.counters: Dict[str, int] = dict.fromkeys(counter_names, 0)
+        self.checks: Dict[str, List[float]] = {}  # function: [calls, seconds]
+        self.calibration_wall: float = 0.0
+        self.files: int = 0
+        self.total_wall: float = 0.0
+        self.total_cpu: float = 0.0
+        self.peak_rss_kib: Optional[int] = None
+        self.traced_peak_bytes: Optional[int] = None
+        self.hooks: List[ProfileHook] = []
+        self.stage: Optional[str] = None
+        self.mark: Tuple[float, float] = (0.0, 0.0)
+        self.started: Optional[Tuple[float, float]] = None
+
+    @beartype
+    def add_hook(self, hook: ProfileHook):
+        self.hooks.append(hook)
+
+    # Runs the measure of the check costs (e.g. check_costs of generate_html_dictionary) before start: its time is
+    # reported apart, not charged to the stages of the run.
+    @beartype
+    def calibrate(self, measure: Callable[[], Any]):
+        if self.started is not None:
+            raise Exception('the profiler is already started')
+        wall: float = time.perf_counter()
+        measure()
+        self.calibration_wall += time.perf_counter() - wall
+
+    @beartype
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.started = (time.perf_counter(), time.process_time())
+        self.mark = self.started
+
+    @beartype
+    def stop(self):
+        if self.started is None:
+            raise Exception('the profiler was not started')
+        self.switch(None)
+        self.total_wall += time.perf_counter() - self.started[0]
+        self.total_cpu += time.process_time() - self.started[1]
+        self.started = None
+        self.files += 1
+        if resource is not None:
+            # kilobytes on linux, bytes on macos
+            scale: int = 1024 if sys.platform == 'darwin' else 1
+            self.peak_rss_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale
+        if self.trace_memory and tracemalloc.is_tracing():
+            self.traced_peak_bytes = max(self.traced_peak_bytes or 0, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+    # Charges the time elapsed since the last switch to the current stage, and returns it to restore it afterwards.
+    # Not decorated with @beartype: called several times per chunk of lines.
+    def switch(self, stage: Optional[str]) -> Optional[str]:
+        wall: float = time.perf_counter()
+        cpu: float = time.process_time()
+        previous: Optional[str] = self.stage
+        if previous is not None:
+            self.wall[previous] += wall - self.mark[0]
+            self.cpu[previous] += cpu - self.mark[1]
+        self.stage = stage
+        self.mark = (wall, cpu)
+        return previous
+
+    # Not decorated with @beartype: called once per chunk of lines.
+    def count(self, counter: str, value: int = 1):
+        self.counters[counter] += value
+
+    # Not decorated with @beartype: called once per chunk of lines.
+    def check(self, function: str, calls: int, cost: float):
+        totals: List[float] = self.checks.setdefault(function, [0, 0.0])
+        totals[0] += calls
+        totals[1] += calls * cost
+
+    @beartype
+    def report(self) -> Dict[str, Any]:
+        stages: Dict[str, Dict[str, float]] = {stage: {'wall_s': self.wall[stage], 'cpu_s': self.cpu[stage]}
+                                               for stage in stage_names}
+        stages[other_stage] = {'wall_s': max(0.0, self.total_wall - sum(self.wall.values())),
+                               'cpu_s': max(0.0, self.total_cpu - sum(self.cpu.values()))}
+        return {
+            'files': self.files,
+            'wall_s': self.total_wall,
+            'cpu_s': self.total_cpu,
+            'stages': stages,
+            'counters': dict(self.counters),
+            'beartype': {
+                'estimated_s': sum(seconds for _, seconds in self.checks.values()),
+                'calibration_s': self.calibration_wall,
+                'functions': {function: {'calls': int(calls), 'estimated_s': seconds}
+                              for function, (calls, seconds) in sorted(self.checks.items())},
+            },
+            'peak_rss_kib': self.peak_rss_kib,
+            'traced_peak_bytes': self.traced_peak_bytes,
+        }
+
+    # Calls the hooks with the report of this profiler, e.g. once a single run is over.
+    @beartype
+    def publish(self, name: str):
+        report: Dict[str, Any] = self.report()
+        for hook in self.hooks:
+            hook(name, report)
+
+    # Adds the report of another run (e.g. of a batch worker) to this profiler, then calls the hooks with it.
+    # Times and counters are summed, peak memories are the maximum over the runs.
+    @beartype
+    def merge(self, name: str, report: Dict[str, Any]):
+        self.files += report['files']
+        self.total_wall += report['wall_s']
+        self.total_cpu += report['cpu_s']
+        for stage in stage_names:
+            self.wall[stage] += report['stages'][stage]['wall_s']
+            self.cpu[stage] += report['stages'][stage]['cpu_s']
+        for counter, value in report['counters'].items():
+            self.counters[counter] = self.counters.get(counter, 0) + value
+        self.calibration_wall += report['beartype']['calibration_s']
+        for function, totals in report['beartype']['functions'].items():
+            self.check(function, totals['calls'], 0.0)
+            self.checks[function][1] += totals['estimated_s']
+        for key in ['peak_rss_kib', 'traced_peak_bytes']:
+            if report[key] is not None:
+                setattr(self, key, max(getattr(self, key) or 0, report[key]))
+        for hook in self.hooks:
+            hook(name, report)
+
+
+@beartype
+def write_report(path: Path, report: Dict[str, Any]):
+    path.write_text(json.dumps(report, indent=1), encoding='utf-8')
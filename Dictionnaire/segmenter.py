@@ -0,0 +1,224 @@
+# MIT License
+#
+# Copyright (c) 2023 ESUNA - Sourigna SIMMALAVONG
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+from beartype import beartype
+from beartype.typing import List, Dict, Optional, Tuple, Pattern
+
+import Dictionnaire.rulesets  # noqa: F401, makes the regex-rulesets modules importable
+from Dictionnaire.dictionary_table import DictionaryTable
+from chinese_tone_generator import cjk_range, translation_character
+from tone_analysis import ToneAnalysis, analyze_pinyins
+
+# Splits raw chinese text into the words of the dictionaries, and annotates them with (ideogram pinyin translation)
+# entries, one per character since the rulesets render a single ideogram per entry:
+# 你好 -> (你 nǐ hello)(好 hǎo), the translation going with the first character.
+# The words are found in a trie of the dictionary ideograms, either by forward maximum matching (longest word first)
+# or by a shortest path in the DAG of all the dictionary words of the text (fewest words, then fewest unknown
+# characters).
+
+# Text already annotated, or rendered, is left as is
+annotated_pattern: Pattern = re.compile(r"[\(（][^\)）\n]*[\)）]|<span class='container.*?</span></span>")
+cjk_run_pattern: Pattern = re.compile(fr'[{cjk_range}]+')
+# Characters the rulesets do not accept in a translation
+untranslatable_pattern: Pattern = re.compile(fr'[^\s{translation_character}]+')
+leaf: str = ''  # trie key of the row of the word ending at a node
+
+
+class Segmenter:
+    @beartype
+    def __init__(self, table: DictionaryTable):
+        self.table: DictionaryTable = table
+        # ideogram characters -> ... -> {leaf: row}, the first row of a word wins
+        self.trie: Dict[str, dict] = {}
+        for row, ideogram_id in enumerate(table.ideograms):
+            node: Dict[str, dict] = self.trie
+            for character in table.strings[ideogram_id]:
+                node = node.setdefault(character, {})
+            node.setdefault(leaf, row)
+
+    # Called for every character: not wrapped by beartype.
+    # Dictionary words starting at start: (end, row), shortest first
+    def words_at(self, text: str, start: int) -> List[Tuple[int, int]]:
+        words: List[Tuple[int, int]] = []
+        node: Optional[Dict[str, dict]] = self.trie
+        for end in range(start, len(text)):
+            node = node.get(text[end])
+            if node is None:
+                break
+            if leaf in node:
+                words.append((end + 1, node[leaf]))
+        return words
+
+    # (word, row or None if unknown) of a text made of chinese characters only
+    @beartype
+    def segment_forward(self, text: str) -> List[Tuple[str, Optional[int]]]:
+        segments: List[Tuple[str, Optional[int]]] = []
+        start: int = 0
+        while start < len(text):
+            words: List[Tuple[int, int]] = self.words_at(text, start)
+            end, row = words[-1] if words else (start + 1, None)
+            segments.append((text[start:end], row))
+            start = end
+        return segments
+
+    @beartype
+    def segment_dag(self, text: str) -> List[Tuple[str, Optional[int]]]:
+        # costs[i]: (words, unknown characters) of the best segmentation of text[i:], computed backwards
+        costs: List[Tuple[int, int]] = [(0, 0)] * (len(text) + 1)
+        choices: List[Tuple[int, Optional[int]]] = [(0, None)] * len(text)
+        for start in range(len(text) - 1, -1, -1):
+            words_cost, unknown_cost = costs[start + 1]
+            best: Tuple[int, int] = (words_cost + 1, unknown_cost + 1)
+            choice: Tuple[int, Optional[int]] = (start + 1, None)
+            for end, row in self.words_at(text, start):
+                words_cost, unknown_cost = costs[end]
+                # <=: the longest word wins ties
+                if (words_cost + 1, unknown_cost) <= best:
+                    best = (words_cost + 1, unknown_cost)
+                    choice = (end, row)
+            costs[start] = best
+            choices[start] = choice
+        segments: List[Tuple[str, Optional[int]]] = []
+        start: int = 0
+        while start < len(text):
+            end, row = choices[start]
+            segments.append((text[start:end], row))
+            start = end
+        return segments
+
+    # Markup of the words, given the syllables of their pinyins
+    @beartype
+    def annotate_words(self, segments: List[Tuple[str, Optional[int]]], translations: bool = True) -> str:
+        rows: List[int] = sorted({row for _, row in segments if row is not None})
+        pinyins: List[str] = [self.table.strings[self.table.pinyins[row]] for row in rows]
+        analysis: ToneAnalysis = analyze_pinyins(pinyins)
+        syllables: Dict[int, List[str]] = {row: [pinyin[start:end] for start, end in analysis.word_spans(index)]
+                                           for index, (row, pinyin) in enumerate(zip(rows, pinyins))}
+        markup: List[str] = []
+        for word, row in segments:
+            if row is None:
+                markup.append(word)
+                continue
+            word_syllables: List[str] = syllables[row]
+            translation: str = ' '.join(untranslatable_pattern.sub(
+                ' ', self.table.strings[self.table.translations[row]]).split()) if translations else ''
+            if len(word_syllables) != len(word):
+                if len(word) == 1:
+                    # A pinyin not made of syllables (ng, m, r): the raw pinyin
+                    pinyin: str = self.table.strings[self.table.pinyins[row]]
+                    markup.append(f'({word} {pinyin} {translation})' if translation else f'({word} {pinyin})')
+                    continue
+                # Erhua, or a pinyin not made of syllables: the characters alone, if known
+                known: List[Tuple[str, Optional[int]]] = [
+                    (character, self.trie.get(character, {}).get(leaf)) for character in word]
+                markup.append(self.annotate_words(known, translations)
+                              if any(row is not None for _, row in known) else word)
+                continue
+            for index, (character, syllable) in enumerate(zip(word, word_syllables)):
+                markup.append(f'({character} {syllable} {translation})' if index == 0 and translation
+                              else f'({character} {syllable})')
+        return ''.join(markup)
+
+    @beartype
+    def annotate(self, text: str, method: str = 'dag', translations: bool = True) -> str:
+        segment = self.segment_dag if method == 'dag' else self.segment_forward
+        segments: List[Tuple[str, Optional[int]]] = []
+        position: int = 0
+        # Chinese runs out of the annotated text, the rest is copied as unknown segments
+        for annotated in list(annotated_pattern.finditer(text)) + [None]:
+            end: int = annotated.start() if annotated is not None else len(text)
+            for run in cjk_run_pattern.finditer(text, position, end):
+                segments.append((text[position:run.start()], None))
+                segments += segment(run.group())
+                position = run.end()
+            segments.append((text[position:end], None))
+            if annotated is not None:
+                segments.append((annotated.group(), None))
+                position = annotated.end()
+        return self.annotate_words(segments, translations)
+
+
+# (dictionary lines, text, expected annotation)
+check_cases: List[Tuple[List[str], str, str]] = [
+    # a single character whose pinyin has no syllable
+    (['(nǐ 你 you)(hǎo 好 good)', '(ng 嗯 hm)'], '嗯你好', '(嗯 ng hm)(你 nǐ you)(好 hǎo good)'),
+    (['(m 呣)'], '呣', '(呣 m)'),
+    # the first row of the dictionary, found through the characters of a word with an unexpected pinyin
+    (['(nǐ 你 you)', '(nǐr 你儿 you)'], '你儿', '(你 nǐ you)儿'),
+]
+
+
+@beartype
+def check_annotations() -> List[str]:
+    failures: List[str] = []
+    for lines, text, expected in check_cases:
+        annotated: str = Segmenter(DictionaryTable.from_lines(lines)).annotate(text)
+        if annotated != expected:
+            failures.append(f'{text}: {annotated} instead of {expected}')
+    return failures
+
+
+if __name__ == '__main__':
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description='Annotate raw chinese text with the (ideogram pinyin translation) entries of dictionaries.')
+    parser.add_argument('dictionaries', type=Path, nargs='*', metavar='path_to_input_dictionary.md')
+    parser.add_argument('--text', type=Path, action='append', default=[],
+                        help='text to annotate (repeatable), - reads stdin')
+    parser.add_argument('--method', choices=['dag', 'forward'], default='dag',
+                        help='fewest words (default) or forward maximum matching')
+    parser.add_argument('--no-translation', action='store_true', help='only annotate the pinyin')
+    parser.add_argument('--in-place', action='store_true', help='rewrite the texts instead of printing them')
+    parser.add_argument('--check', action='store_true', help='only run the annotation checks, exit 1 if any fails')
+    args: argparse.Namespace = parser.parse_args()
+    sys.stdin.reconfigure(encoding='utf-8')
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    if args.check:
+        check_failures: List[str] = check_annotations()
+        for failure in check_failures:
+            print(failure)
+        print(f'{len(check_cases) - len(check_failures)}/{len(check_cases)} checks passed')
+        sys.exit(1 if check_failures else 0)
+    if not args.dictionaries or not args.text:
+        parser.error('give dictionaries and --text, or --check')
+
+    start_time: float = time.perf_counter()
+    segmenter: Segmenter = Segmenter(DictionaryTable.from_paths(args.dictionaries))
+    print(f'{len(segmenter.table)} entries loaded in {time.perf_counter() - start_time:.3f} s', file=sys.stderr)
+    for text_path in args.text:
+        text: str = sys.stdin.read() if text_path == Path('-') else text_path.read_text(encoding='utf-8')
+        start_time = time.perf_counter()
+        annotated_text: str = segmenter.annotate(text, args.method, not args.no_translation)
+        print(f'{text_path}: {len(text)} characters annotated in {time.perf_counter() - start_time:.3f} s',
+              file=sys.stderr)
+        if args.in_place and text_path != Path('-'):
+            tmp_path: Path = text_path.with_name(f'{text_path.name}.tmp')
+            tmp_path.write_text(annotated_text, encoding='utf-8')
+            tmp_path.replace(text_path)
+        else:
+            sys.stdout.write(annotated_text)
@@ -0,0 +1,128 @@
+# MIT License
+#
+# Copyright (c) 2023 ESUNA - Sourigna SIMMALAVONG
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import mmap
+import re
+import sys
+import time
+from pathlib import Path
+
+from beartype import beartype
+from beartype.typing import List, Tuple, Iterator, Pattern, Union
+
+from Dictionnaire.generate_html_dictionary import parse_lines, read_lines
+
+# Single pass tokenizer over the bytes of a (memory-mapped) dictionary: no line is decoded, split or copied, each
+# (pinyin ideogram translation) group gives the offsets of its tokens in the buffer, decoded only when accessed.
+# Full-width parentheses are accepted like in the regex rulesets, and the closing parenthesis of the last group of a
+# line may be missing (autocompletion).
+
+# Runs of bytes but whitespaces, parentheses, and the first byte of a full-width parenthesis
+token: bytes = rb'(?:[^\s()\xef]+|\xef(?!\xbc[\x88\x89]))+'
+blank: bytes = rb'[ \t\r\f\v]'
+tokenizer_pattern: Pattern = re.compile(
+    rb'(\n)|(?:\(|\xef\xbc\x88)' + blank + rb'*' +
+    rb'(' + token + rb')' + blank + rb'+' +  # pinyin
+    rb'(' + token + rb')' +  # ideogram
+    rb'(?:' + blank + rb'+(' + token + rb'(?:' + blank + rb'+' + token + rb')*))?' + blank + rb'*' +  # translation
+    rb'(?:\)|\xef\xbc\x89|(?=\n)|\Z)')
+whitespaces: Pattern = re.compile(rb'\s+')
+
+
+# One per entry: not wrapped by beartype.
+# The buffer must still be open (i.e. the iteration of tokenize_file not finished) to decode the tokens.
+class TokenSpans:
+    __slots__ = ('buffer', 'line', 'line_start', 'start', 'pinyin_span', 'ideogram_span', 'translation_span')
+
+    def __init__(self, buffer: Union[bytes, mmap.mmap], line: int, line_start: int, start: int,
+                 pinyin_span: Tuple[int, int], ideogram_span: Tuple[int, int], translation_span: Tuple[int, int]):
+        self.buffer: Union[bytes, mmap.mmap] = buffer
+        self.line: int = line  # starting at 1
+        self.line_start: int = line_start  # offset of the line in the buffer
+        self.start: int = start  # offset of the opening parenthesis in the buffer
+        self.pinyin_span: Tuple[int, int] = pinyin_span
+        self.ideogram_span: Tuple[int, int] = ideogram_span
+        self.translation_span: Tuple[int, int] = translation_span  # empty span if no translation
+
+    @property
+    def column(self) -> int:  # in characters, starting at 0
+        return len(self.buffer[self.line_start:self.start].decode('utf-8'))
+
+    @property
+    def pinyin(self) -> str:
+        return self.buffer[self.pinyin_span[0]:self.pinyin_span[1]].decode('utf-8')
+
+    @property
+    def ideogram(self) -> str:
+        return self.buffer[self.ideogram_span[0]:self.ideogram_span[1]].decode('utf-8')
+
+    @property
+    def translation(self) -> str:
+        # Whitespaces between words are normalized like split does
+        return whitespaces.sub(b' ', self.buffer[self.translation_span[0]:self.translation_span[1]]).decode('utf-8')
+
+
+@beartype
+def tokenize(buffer: Union[bytes, mmap.mmap]) -> Iterator[TokenSpans]:
+    line: int = 1
+    line_start: int = 0
+    for match in tokenizer_pattern.finditer(buffer):
+        if match.start(1) >= 0:
+            line += 1
+            line_start = match.end(1)
+            continue
+        translation_span: Tuple[int, int] = match.span(4)
+        if translation_span[0] < 0:
+            translation_span = (match.end(3), match.end(3))
+        yield TokenSpans(buffer, line, line_start, match.start(), match.span(2), match.span(3), translation_span)
+
+
+@beartype
+def tokenize_file(path: Path) -> Iterator[TokenSpans]:
+    with path.open('rb') as file:
+        if path.stat().st_size == 0:  # an empty file cannot be mapped
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield from tokenize(buffer)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print('Usage: python tokenizer.py path_to_input_dictionary.md')
+        raise Exception()
+    path: Path = Path(sys.argv[1])
+
+    start: float = time.perf_counter()
+    entries: List[Tuple[str, str, str]] = [(tokens.pinyin, tokens.ideogram, tokens.translation)
+                                           for tokens in tokenize_file(path)]
+    tokenizer_seconds: float = time.perf_counter() - start
+    start = time.perf_counter()
+    split_entries: List[Tuple[str, str, str]] = [
+        (chinese_struct.pinyin, chinese_struct.ideogram, translation)
+        for _, line_entries in parse_lines(read_lines([path])) if line_entries is not None
+        for chinese_struct, translation in line_entries]
+    split_seconds: float = time.perf_counter() - start
+
+    print(f'{len(entries)} entries, tokenizer: {tokenizer_seconds:.3f} s, split: {split_seconds:.3f} s')
+    if entries != split_entries:
+        print('the tokenizer and split disagree')
+        sys.exit(1)
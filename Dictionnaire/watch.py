@@ -0,0 +1,367 @@
+# MIT License
+#
+# Copyright (c) 2023 ESUNA - Sourigna SIMMALAVONG
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import argparse
+import asyncio
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import struct
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+from beartype import beartype
+from beartype.typing import List, Dict, Optional, Tuple, Callable, Deque
+
+import Dictionnaire.rulesets  # noqa: F401, makes the regex-rulesets modules importable
+from Dictionnaire.deduplicator import DedupMode
+from Dictionnaire.generate_html_dictionary import make_output_formats
+from Dictionnaire.manifest import Manifest, BuildStatus, manifest_name, update_html_dictionaries
+from chinese_tone_renderer import render
+
+# Keeps a vault up to date while it is edited:
+# - the notes are rendered in place (Chinese tone.regex), only the paragraphs changed since the last render,
+# - the dictionaries are regenerated when their source changes (only the appended lines if possible, see manifest).
+# Changes come from inotify (linux, through ctypes), or from polling the modification times otherwise. A path is
+# processed once it has not changed for the debounce delay, and only if its content hash changed: saving without
+# changes, or the watcher's own writes, do nothing.
+
+# inotify(7)
+in_modify: int = 0x2
+in_close_write: int = 0x8
+in_moved_to: int = 0x80
+in_create: int = 0x100
+in_q_overflow: int = 0x4000
+in_isdir: int = 0x40000000
+in_nonblock: int = 0o4000
+in_cloexec: int = 0o2000000
+inotify_event_header: struct.Struct = struct.Struct('iIII')
+ignored_dirs: List[str] = ['.obsidian', '.git', '.trash']
+
+
+class WatchStats:
+    @beartype
+    def __init__(self):
+        self.events: int = 0  # file system events
+        self.processed: int = 0  # paths rendered or regenerated
+        self.unchanged: int = 0  # paths whose content hash did not change
+        self.latencies: Deque[float] = deque(maxlen=1000)  # seconds from the first event to the end of processing
+
+    @beartype
+    def percentile(self, fraction: float) -> float:
+        if not self.latencies:
+            return 0.0
+        latencies: List[float] = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+    @beartype
+    def report(self, queue_depth: int) -> str:
+        return f'events: {self.events}, processed: {self.processed}, unchanged: {self.unchanged}, ' \
+               f'queue depth: {queue_depth}, latency p50: {self.percentile(0.5) * 1000:.0f} ms, ' \
+               f'p95: {self.percentile(0.95) * 1000:.0f} ms, max: {self.percentile(1.0) * 1000:.0f} ms'
+
+
+@beartype
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+@beartype
+def is_blank(line: str) -> bool:
+    return line.strip() == ''
+
+
+# Renders the paragraphs of text which differ from previous (the last rendered version), the rest is already rendered.
+# Paragraphs, not lines: the translation of an entry may span several lines.
+@beartype
+def render_changes(previous: Optional[str], text: str) -> str:
+    if previous is None:
+        return render(text)
+    old_lines: List[str] = previous.splitlines(keepends=True)
+    new_lines: List[str] = text.splitlines(keepends=True)
+    start: int = 0
+    while start < min(len(old_lines), len(new_lines)) and old_lines[start] == new_lines[start]:
+        start += 1
+    end: int = len(new_lines)
+    old_end: int = len(old_lines)
+    while end > start and old_end > start and old_lines[old_end - 1] == new_lines[end - 1]:
+        end -= 1
+        old_end -= 1
+    while start > 0 and not is_blank(new_lines[start - 1]):
+        start -= 1
+    while end < len(new_lines) and not is_blank(new_lines[end]):
+        end += 1
+    return ''.join(new_lines[:start]) + render(''.join(new_lines[start:end])) + ''.join(new_lines[end:])
+
+
+@beartype
+def write_atomically(path: Path, text: str):
+    tmp_path: Path = path.with_name(f'.{path.name}.tmp')
+    tmp_path.write_text(text, encoding='utf-8')
+    tmp_path.replace(path)
+
+
+class Inotify:
+    @beartype
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd: int = self.libc.inotify_init1(in_nonblock | in_cloexec)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.dirs: Dict[int, Path] = {}  # watch descriptor -> directory
+
+    @beartype
+    def add_tree(self, root: Path):
+        for dir_path, dir_names, _ in os.walk(root):
+            dir_names[:] = [name for name in dir_names if name not in ignored_dirs]
+            wd: int = self.libc.inotify_add_watch(self.fd, os.fsencode(dir_path),
+                                                  in_close_write | in_moved_to | in_create)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f'inotify_add_watch failed on {dir_path}')
+            self.dirs[wd] = Path(dir_path)
+
+    # Changed files of the pending events, None on queue overflow (rescan needed)
+    @beartype
+    def read(self) -> Optional[List[Path]]:
+        paths: List[Path] = []
+        try:
+            buffer: bytes = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return paths
+        offset: int = 0
+        while offset < len(buffer):
+            wd, mask, _, length = inotify_event_header.unpack_from(buffer, offset)
+            name: str = os.fsdecode(buffer[offset + inotify_event_header.size:
+                                           offset + inotify_event_header.size + length].rstrip(b'\0'))
+            offset += inotify_event_header.size + length
+            if mask & in_q_overflow:
+                return None
+            if wd not in self.dirs:
+                continue
+            path: Path = self.dirs[wd].joinpath(name)
+            if mask & in_isdir:
+                if mask & (in_create | in_moved_to) and name not in ignored_dirs:
+                    self.add_tree(path)
+            elif mask & (in_close_write | in_moved_to):
+                paths.append(path)
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+# Modification time and size of every note, for polling
+@beartype
+def scan(root: Path) -> Dict[Path, Tuple[float, int]]:
+    states: Dict[Path, Tuple[float, int]] = {}
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names[:] = [name for name in dir_names if name not in ignored_dirs]
+        for file_name in file_names:
+            if file_name.endswith('.md'):
+                path: Path = Path(dir_path, file_name)
+                try:
+                    stat: os.stat_result = path.stat()
+                except FileNotFoundError:
+                    continue
+                states[path] = (stat.st_mtime, stat.st_size)
+    return states
+
+
+class VaultWatcher:
+    @beartype
+    def __init__(self, vault: Path, render_notes: bool, dictionaries: Dict[Path, Path], debounce: float = 0.5,
+                 poll_interval: float = 2.0, polling: bool = False, log: Callable[[str], None] = print):
+        self.vault: Path = vault.resolve()
+        self.render_notes: bool = render_notes
+        self.dictionaries: Dict[Path, Path] = {src.resolve(): out_dir.resolve() for src, out_dir in dictionaries.items()}
+        self.debounce: float = debounce
+        self.poll_interval: float = poll_interval
+        self.polling: bool = polling
+        self.log: Callable[[str], None] = log
+        self.stats: WatchStats = WatchStats()
+        self.first_events: Dict[Path, float] = {}  # pending path -> time of its first event
+        self.last_events: Dict[Path, float] = {}  # pending path -> time of its last event
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.hashes: Dict[Path, str] = {}  # content hash when last seen or written
+        self.rendered: Dict[Path, str] = {}  # last rendered content, to only render the changes
+        self.manifests: Dict[Path, Manifest] = {}
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self.first_events) + self.queue.qsize()
+
+    @beartype
+    def is_output(self, path: Path) -> bool:
+        # The generated dictionaries (and their sources) are not notes to render
+        return path in self.dictionaries or any(path.parent == out_dir for out_dir in self.dictionaries.values())
+
+    # Called for every event: not wrapped by beartype.
+    def on_change(self, path: Path):
+        if path.suffix != '.md' or path.name.startswith('.'):
+            return
+        self.stats.events += 1
+        now: float = time.monotonic()
+        self.first_events.setdefault(path, now)
+        self.last_events[path] = now
+
+    async def debouncer(self):
+        while True:
+            await asyncio.sleep(self.debounce / 4)
+            now: float = time.monotonic()
+            for path, last_event in list(self.last_events.items()):
+                if now - last_event >= self.debounce:
+                    del self.last_events[path]
+                    await self.queue.put((path, self.first_events.pop(path)))
+
+    async def worker(self):
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        while True:
+            path, first_event = await self.queue.get()
+            try:
+                processed: bool = await loop.run_in_executor(None, self.process, path)
+            except Exception as exception:
+                self.log(f'{path}: {exception}')
+                processed = False
+            if processed:
+                self.stats.processed += 1
+                self.stats.latencies.append(time.monotonic() - first_event)
+            self.queue.task_done()
+
+    # Runs in a thread: returns whether something was done
+    @beartype
+    def process(self, path: Path) -> bool:
+        try:
+            text: str = path.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            self.hashes.pop(path, None)
+            self.rendered.pop(path, None)
+            return False
+        text_hash: str = hash_text(text)
+        if self.hashes.get(path) == text_hash:
+            self.stats.unchanged += 1
+            return False
+        self.hashes[path] = text_hash
+        if path in self.dictionaries:
+            out_dir: Path = self.dictionaries[path]
+            manifest: Manifest = self.manifests.setdefault(out_dir, Manifest(out_dir.joinpath(manifest_name)))
+            status: BuildStatus
+            status, _, manifest.entries[str(path)] = update_html_dictionaries(
+                path, make_output_formats(path, out_dir), manifest.entries.get(str(path)), DedupMode.line)
+            manifest.save()
+            self.log(f'{path}: {status.name}')
+            return True
+        if not self.render_notes or self.is_output(path):
+            return False
+        rendered: str = render_changes(self.rendered.get(path), text)
+        self.rendered[path] = rendered
+        if rendered != text:
+            self.hashes[path] = hash_text(rendered)
+            write_atomically(path, rendered)
+            self.log(f'{path}: rendered')
+        return True
+
+    async def poll(self):
+        states: Dict[Path, Tuple[float, int]] = scan(self.vault)
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            new_states: Dict[Path, Tuple[float, int]] = scan(self.vault)
+            for path, state in new_states.items():
+                if states.get(path) != state:
+                    self.on_change(path)
+            states = new_states
+
+    async def watch_inotify(self, inotify: Inotify):
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        ready: asyncio.Event = asyncio.Event()
+        loop.add_reader(inotify.fd, ready.set)
+        states: Dict[Path, Tuple[float, int]] = {}
+        try:
+            while True:
+                await ready.wait()
+                ready.clear()
+                paths: Optional[List[Path]] = inotify.read()
+                if paths is None:
+                    # Events were lost: compare with the last rescan
+                    new_states: Dict[Path, Tuple[float, int]] = scan(self.vault)
+                    paths = [path for path, state in new_states.items() if states.get(path) != state]
+                    states = new_states
+                for path in paths:
+                    self.on_change(path)
+        finally:
+            loop.remove_reader(inotify.fd)
+
+    async def print_stats(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self.log(self.stats.report(self.queue_depth))
+
+    async def run(self, stats_interval: float = 60.0):
+        tasks: List[asyncio.Task] = [asyncio.create_task(self.debouncer()), asyncio.create_task(self.worker()),
+                                     asyncio.create_task(self.print_stats(stats_interval))]
+        inotify: Optional[Inotify] = None
+        if not self.polling:
+            try:
+                inotify = Inotify()
+                inotify.add_tree(self.vault)
+                for src in self.dictionaries:
+                    if self.vault not in src.parents:
+                        inotify.add_tree(src.parent)
+            except (OSError, AttributeError) as exception:
+                self.log(f'inotify not available ({exception}), polling every {self.poll_interval} s')
+                inotify = None
+        tasks.append(asyncio.create_task(self.watch_inotify(inotify) if inotify is not None else self.poll()))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            if inotify is not None:
+                inotify.close()
+
+
+if __name__ == '__main__':
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description='Watch a vault: render the changed notes and regenerate the changed dictionaries.')
+    parser.add_argument('vault', type=Path)
+    parser.add_argument('--render', action='store_true', help='render the changed notes in place')
+    parser.add_argument('--dictionary', nargs=2, type=Path, action='append', default=[],
+                        metavar=('SRC', 'OUT_DIR'), help='regenerate the html dictionaries of SRC into OUT_DIR')
+    parser.add_argument('--debounce', type=float, default=0.5, help='seconds without change before processing')
+    parser.add_argument('--polling', action='store_true', help='poll instead of using inotify')
+    parser.add_argument('--poll-interval', type=float, default=2.0)
+    parser.add_argument('--stats-interval', type=float, default=60.0, help='seconds between two stats reports')
+    args: argparse.Namespace = parser.parse_args()
+    sys.stdout.reconfigure(encoding='utf-8')
+    if not args.vault.is_dir():
+        raise Exception(f'argument is not a dir: {args.vault}')
+    if not args.render and not args.dictionary:
+        parser.error('nothing to do: give --render and/or --dictionary')
+
+    watcher: VaultWatcher = VaultWatcher(args.vault, args.render, dict(args.dictionary), args.debounce,
+                                         args.poll_interval, args.polling, lambda message: print(message, flush=True))
+    try:
+        asyncio.run(watcher.run(args.stats_interval))
+    except KeyboardInterrupt:
+        print(watcher.stats.report(watcher.queue_depth))
@@ -0,0 +1,175 @@
+# MIT License
+#
+# Copyright (c) 2023 ESUNA - Sourigna SIMMALAVONG
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from beartype import beartype
+from beartype.typing import List, Dict, Callable, Any, Tuple
+
+import Dictionnaire.rulesets  # noqa: F401, makes the regex-rulesets modules importable
+from Dictionnaire.chinese_token import ChineseToken
+from Dictionnaire.dictionary_table import DictionaryTable
+from Dictionnaire.deduplicator import Deduplicator
+from Dictionnaire.tokenizer import tokenize_file
+from Dictionnaire.generate_html_dictionary import generate_html_dictionaries, make_output_formats, parse_lines, \
+    read_lines
+from benchmarks.synthetic import SyntheticGenerator
+from chinese_tone_eraser import erase
+from chinese_tone_generator import make_tone_rules, rules_to_html
+from chinese_tone_renderer import render, apply_rules
+from typing_transformer_rules_generator import make_rules
+
+# Times the dictionary generation, the rule generation and the rendering on a synthetic corpus, and measures the size of
+# the rendered note in both html styles.
+# Results are written as JSON and can be compared against a saved baseline: a benchmark slower than its baseline by
+# more than the threshold is a regression.
+
+sizes: Dict[str, Dict[str, int]] = {
+    'small': {'dictionary_lines': 2000, 'note_paragraphs': 20},
+    'medium': {'dictionary_lines': 20000, 'note_paragraphs': 200},
+    'large': {'dictionary_lines': 100000, 'note_paragraphs': 1000},
+}
+
+
+@beartype
+def best_time(function: Callable[[], Any], repeat: int) -> float:
+    best: float = float('inf')
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@beartype
+def deduplicate(lines: List[str]) -> List[str]:
+    deduplicator: Deduplicator = Deduplicator()
+    return [line for line in lines if deduplicator.keep_line(line)]
+
+
+# Size in bytes of the note, raw and rendered in both html styles.
+@beartype
+def render_sizes(note: str) -> Dict[str, int]:
+    return {
+        'note': len(note.encode('utf-8')),
+        'rendered': len(render(note).encode('utf-8')),
+        'rendered_compact': len(render(note, compact=True).encode('utf-8')),
+    }
+
+
+@beartype
+def make_benchmarks(work_dir: Path, dictionary_lines: int, note_paragraphs: int,
+                    seed: int) -> Tuple[Dict[str, Callable[[], Any]], Dict[str, int]]:
+    generator: SyntheticGenerator = SyntheticGenerator(seed)
+    dictionary: Path = work_dir.joinpath('dictionary.md')
+    dictionary.write_text(generator.dictionary(dictionary_lines), encoding='utf-8')
+    dictionary_text_lines: List[str] = dictionary.read_text(encoding='utf-8').splitlines()
+    note: str = generator.note(note_paragraphs)
+    rendered: str = render(note)
+    rendered_compact: str = render(note, compact=True)
+    outputs: Dict[Path, List[ChineseToken]] = make_output_formats(dictionary, work_dir)
+
+    return {
+        'dictionary.parse': lambda: list(parse_lines(read_lines([dictionary]))),
+        'dictionary.tokenize': lambda: [(tokens.pinyin, tokens.ideogram, tokens.translation)
+                                        for tokens in tokenize_file(dictionary)],
+        'dictionary.table': lambda: DictionaryTable.from_paths([dictionary]),
+        'dictionary.generate': lambda: generate_html_dictionaries(dictionary, outputs),
+        'dictionary.dedup': lambda: deduplicate(dictionary_text_lines),
+        'rules.tone': make_tone_rules,
+        'rules.typing_transformer': make_rules,
+        'render.single_pass': lambda: render(note),
+        'render.compact': lambda: render(note, compact=True),
+        'render.regex_rules': lambda: apply_rules(note, rules_to_html),
+        'erase.single_pass': lambda: erase(rendered),
+        'erase.compact': lambda: erase(rendered_compact, compact=True),
+    }, render_sizes(note)
+
+
+@beartype
+def run(size: str, repeat: int, seed: int, only: List[str]) -> Dict[str, Any]:
+    results: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        benchmarks: Dict[str, Callable[[], Any]]
+        note_sizes: Dict[str, int]
+        benchmarks, note_sizes = make_benchmarks(Path(work_dir), seed=seed, **sizes[size])
+        for name, function in benchmarks.items():
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            results[name] = {'seconds': best_time(function, repeat)}
+            print(f"{name}: {results[name]['seconds'] * 1000:.1f} ms", file=sys.stderr)
+    print(f"rendered note: {note_sizes['rendered']} bytes, compact: {note_sizes['rendered_compact']} bytes "
+          f"({note_sizes['rendered_compact'] / note_sizes['rendered']:.0%})", file=sys.stderr)
+    return {
+        'config': {'size': size, 'repeat': repeat, 'seed': seed, **sizes[size]},
+        'machine': {'python': platform.python_version(), 'platform': platform.platform()},
+        'sizes': note_sizes,
+        'results': results,
+    }
+
+
+# Returns the regressions, as messages.
+@beartype
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    regressions: List[str] = []
+    if results['config'] != baseline['config']:
+        regressions.append(f"config differs from the baseline: {results['config']} != {baseline['config']}")
+        return regressions
+    for name, result in results['results'].items():
+        if name not in baseline['results']:
+            continue
+        ratio: float = result['seconds'] / baseline['results'][name]['seconds']
+        print(f'{name}: {ratio:.2f}x the baseline', file=sys.stderr)
+        if ratio > 1 + threshold:
+            regressions.append(f'{name}: {ratio:.2f}x slower than the baseline (threshold {1 + threshold:.2f}x)')
+    return regressions
+
+
+if __name__ == '__main__':
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description='Run the benchmarks.')
+    parser.add_argument('--size', choices=list(sizes), default='small')
+    parser.add_argument('--repeat', type=int, default=5, help='best time out of this many runs')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='*', default=[], help='benchmark name prefixes, e.g. render dictionary.table')
+    parser.add_argument('--output', type=Path, help='write the results to this JSON file')
+    parser.add_argument('--baseline', type=Path, help='compare the results against this JSON file')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative slowdown over the baseline reported as a regression (default: 0.2)')
+    args: argparse.Namespace = parser.parse_args()
+
+    results: Dict[str, Any] = run(args.size, args.repeat, args.seed, args.only)
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=1), encoding='utf-8')
+    else:
+        print(json.dumps(results, indent=1))
+    if args.baseline is not None:
+        regressions: List[str] = compare(results, json.loads(args.baseline.read_text(encoding='utf-8')),
+                                         args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        sys.exit(1 if regressions else 0)
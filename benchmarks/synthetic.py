@@ -0,0 +1,141 @@
+# MIT License
+#
+# Copyright (c) 2023 ESUNA - Sourigna SIMMALAVONG
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import argparse
+import random
+from pathlib import Path
+
+from beartype import beartype
+from beartype.typing import List, Optional
+
+import Dictionnaire.rulesets  # noqa: F401, makes the regex-rulesets modules importable
+from chinese_tone_generator import cjk_range
+from tone_analysis import initials, finals
+from typing_transformer_rules_generator import toned_characters, untoned_characters_indices
+
+# Synthetic, but realistic, dictionaries and notes: pinyins are made of real initials and finals, toned with the
+# toned_characters table following the usual placement rules, ideograms are taken from the CJK range of the rulesets.
+
+first_cjk: int = ord(cjk_range[0])
+last_cjk: int = ord(cjk_range[-1])
+words: List[str] = ['to', 'be', 'good', 'you', 'me', 'big', 'small', 'learn', 'study', 'book', 'water', 'eat',
+                    'drink', 'see', 'go', 'come', 'person', 'day', 'year', 'country', 'China', 'language', 'love']
+# Finals that are written without ü, the only ones the toned_characters table can tone.
+toneable_finals: List[str] = [final for final in finals if 'ü' not in final and 'v' not in final]
+
+
+@beartype
+def tone_syllable(syllable: str, tone: int) -> str:
+    if tone == 0:
+        return syllable
+    # a and e take the tone mark, o in ou, otherwise the last vowel
+    for vowel in ['a', 'e', 'ou']:
+        if vowel in syllable:
+            position: int = syllable.index(vowel)
+            break
+    else:
+        position: int = max(syllable.rfind(vowel) for vowel in untoned_characters_indices)
+    toned: str = toned_characters[untoned_characters_indices[syllable[position]]][0][tone - 1]
+    return f'{syllable[:position]}{toned}{syllable[position + 1:]}'
+
+
+class SyntheticGenerator:
+    @beartype
+    def __init__(self, seed: int = 0):
+        self.random: random.Random = random.Random(seed)
+
+    @beartype
+    def pinyin(self, max_syllables: int = 2) -> str:
+        syllables: List[str] = []
+        for _ in range(self.random.randint(1, max_syllables)):
+            initial: str = self.random.choice(initials + [''])
+            syllables.append(tone_syllable(initial + self.random.choice(toneable_finals), self.random.randint(0, 4)))
+        return ''.join(syllables)
+
+    @beartype
+    def ideogram(self) -> str:
+        return chr(self.random.randint(first_cjk, last_cjk))
+
+    @beartype
+    def translation(self) -> str:
+        return ' '.join(self.random.choice(words) for _ in range(self.random.randint(0, 3)))
+
+    @beartype
+    def entry(self, ideogram_first: bool = False, max_syllables: int = 1) -> str:
+        tokens: List[str] = [self.pinyin(max_syllables), self.ideogram()]
+        if ideogram_first:
+            tokens.reverse()
+        translation: str = self.translation()
+        if translation:
+            tokens.append(translation)
+        return f"({' '.join(tokens)})"
+
+    # (pinyin ideogram translation) lines of 1 to 3 entries, with blank lines and a share of repeated lines.
+    @beartype
+    def dictionary(self, lines: int, duplicates: float = 0.1, blank_lines: float = 0.05) -> str:
+        out_lines: List[str] = []
+        for _ in range(lines):
+            if self.random.random() < blank_lines:
+                out_lines.append('')
+            elif out_lines and self.random.random() < duplicates:
+                out_lines.append(self.random.choice(out_lines))
+            else:
+                out_lines.append(''.join(self.entry() for _ in range(self.random.randint(1, 3))))
+        return '\n'.join(out_lines) + '\n'
+
+    # Paragraphs of plain text mixed with entries in the four layouts.
+    @beartype
+    def note(self, paragraphs: int, entries_per_paragraph: int = 20) -> str:
+        out_paragraphs: List[str] = []
+        for _ in range(paragraphs):
+            parts: List[str] = []
+            for _ in range(entries_per_paragraph):
+                parts.append(self.entry(ideogram_first=self.random.random() < 0.5))
+                if self.random.random() < 0.3:
+                    parts.append(f' {self.translation()}. ')
+            out_paragraphs.append(''.join(parts))
+        return '\n\n'.join(out_paragraphs) + '\n'
+
+
+@beartype
+def write_corpus(out_dir: Path, dictionary_lines: int, note_paragraphs: int, notes: int = 1, seed: int = 0,
+                 generator: Optional[SyntheticGenerator] = None) -> List[Path]:
+    generator = generator or SyntheticGenerator(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths: List[Path] = [out_dir.joinpath('dictionary.md')]
+    paths[0].write_text(generator.dictionary(dictionary_lines), encoding='utf-8')
+    for note_index in range(notes):
+        paths.append(out_dir.joinpath(f'note_{note_index}.md'))
+        paths[-1].write_text(generator.note(note_paragraphs), encoding='utf-8')
+    return paths
+
+
+if __name__ == '__main__':
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description='Write a synthetic dictionary and notes.')
+    parser.add_argument('out_dir', type=Path)
+    parser.add_argument('--dictionary-lines', type=int, default=10000)
+    parser.add_argument('--note-paragraphs', type=int, default=100)
+    parser.add_argument('--notes', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    args: argparse.Namespace = parser.parse_args()
+    for path in write_corpus(args.out_dir, args.dictionary_lines, args.note_paragraphs, args.notes, args.seed):
+        print(path)
@@ -0,0 +1,229 @@
+# MIT License
+#
+# Copyright (c) 2023 ESUNA - Sourigna SIMMALAVONG
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+from beartype import beartype
+from beartype.typing import List, Dict, Callable, Optional, Any
+
+# Writes the rulesets, the pinyin rules and the CSS into vaults (or back into this repository).
+# An artifact is only regenerated if the code generating it, its input files or the build options changed, or if its
+# output was modified or deleted since the last build (the stamp file keeps the hash of every output).
+
+rulesets_dir: Path = Path(__file__).resolve().parent
+repo_dir: Path = rulesets_dir.parent
+css_path: Path = repo_dir.joinpath('.obsidian', 'chinese_tones.css')
+stamp_name: str = 'obsidian_chinese_build.json'
+
+
+@beartype
+def license_header() -> str:
+    # The MIT license of this file, as comments
+    lines: List[str] = Path(__file__).read_text(encoding='utf-8').splitlines(keepends=True)
+    return ''.join(lines[:lines.index('\n')])
+
+
+@beartype
+def make_chinese_tone_regex(minimize: bool) -> str:
+    from chinese_tone_generator import rules_to_html
+    return '\n'.join(rules_to_html)
+
+
+@beartype
+def make_erase_chinese_tone_regex(minimize: bool) -> str:
+    from chinese_tone_generator import rules_to_edit
+    return '\n'.join(rules_to_edit)
+
+
+@beartype
+def make_compact_chinese_tone_regex(minimize: bool) -> str:
+    from chinese_tone_generator import compact_rules_to_html
+    return '\n'.join(compact_rules_to_html)
+
+
+@beartype
+def make_compact_erase_chinese_tone_regex(minimize: bool) -> str:
+    from chinese_tone_generator import compact_rules_to_edit
+    return '\n'.join(compact_rules_to_edit)
+
+
+@beartype
+def make_pinyin_rules(minimize: bool) -> str:
+    from typing_transformer_rules_generator import make_rules
+    rules: str = make_rules()
+    if minimize:
+        from typing_transformer_compiler import compile_rules
+        from typing_transformer_engine import parse_rules
+        rules = '\n' + ''.join(f'{rule.source.strip()}\n' for rule in compile_rules(parse_rules(rules))[0])
+    return f'{license_header()}{rules.rstrip()}\n'
+
+
+@beartype
+def make_css(minimize: bool) -> str:
+    return css_path.read_text(encoding='utf-8')
+
+
+@beartype
+def make_compact_css(minimize: bool) -> str:
+    from chinese_tone_css import make_compact_css
+    return make_compact_css(css_path.read_text(encoding='utf-8'))
+
+
+class Artifact:
+    @beartype
+    def __init__(self, name: str, make: Callable[[bool], str], code: List[str], inputs: List[Path]):
+        self.name: str = name
+        self.make: Callable[[bool], str] = make
+        self.code: List[str] = code  # modules of this directory generating it
+        self.inputs: List[Path] = inputs
+
+    @beartype
+    def key(self, options: Dict[str, Any]) -> str:
+        digest = hashlib.sha256(json.dumps(options, sort_keys=True).encode('utf-8'))
+        for path in [rulesets_dir.joinpath(f'{module}.py') for module in ['build_vault'] + self.code] + self.inputs:
+            digest.update(path.name.encode('utf-8'))
+            digest.update(path.read_bytes())
+        return digest.hexdigest()
+
+
+artifacts: List[Artifact] = [
+    Artifact('Chinese tone.regex', make_chinese_tone_regex, ['chinese_tone_generator'], []),
+    Artifact('Erase chinese tone.regex', make_erase_chinese_tone_regex, ['chinese_tone_generator'], []),
+    Artifact('Chinese tone compact.regex', make_compact_chinese_tone_regex, ['chinese_tone_generator'], []),
+    Artifact('Erase chinese tone compact.regex', make_compact_erase_chinese_tone_regex, ['chinese_tone_generator'], []),
+    Artifact('pinyin_rules.txt', make_pinyin_rules,
+             ['typing_transformer_rules_generator', 'typing_transformer_compiler', 'typing_transformer_engine'], []),
+    Artifact('chinese_tones.css', make_css, [], [css_path]),
+    Artifact('chinese_tones_compact.css', make_compact_css, ['chinese_tone_css'], [css_path]),
+]
+
+
+# Output path of every artifact, relative to the target directory
+@beartype
+def vault_layout(regex_dir: str) -> Dict[str, str]:
+    return {
+        'Chinese tone.regex': f'{regex_dir}/Chinese tone.regex',
+        'Erase chinese tone.regex': f'{regex_dir}/Erase chinese tone.regex',
+        'Chinese tone compact.regex': f'{regex_dir}/Chinese tone compact.regex',
+        'Erase chinese tone compact.regex': f'{regex_dir}/Erase chinese tone compact.regex',
+        'pinyin_rules.txt': '.obsidian/pinyin_rules.txt',
+        'chinese_tones.css': '.obsidian/snippets/chinese_tones.css',
+        'chinese_tones_compact.css': '.obsidian/snippets/chinese_tones_compact.css',
+    }
+
+
+# The committed artifacts of this repository (chinese_tones.css is the source itself)
+repo_layout: Dict[str, str] = {
+    'Chinese tone.regex': 'regex-rulesets/Chinese tone.regex',
+    'Erase chinese tone.regex': 'regex-rulesets/Erase chinese tone.regex',
+    'Chinese tone compact.regex': 'regex-rulesets/Chinese tone compact.regex',
+    'Erase chinese tone compact.regex': 'regex-rulesets/Erase chinese tone compact.regex',
+    'pinyin_rules.txt': 'regex-rulesets/pinyin_rules.txt',
+    'chinese_tones_compact.css': '.obsidian/chinese_tones_compact.css',
+}
+
+
+@beartype
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+@beartype
+def write_atomically(path: Path, text: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path: Path = path.with_name(f'{path.name}.tmp')
+    with tmp_path.open('w', encoding='utf-8', newline='\n') as tmp_file:
+        tmp_file.write(text)
+        tmp_file.flush()
+        os.fsync(tmp_file.fileno())
+    tmp_path.replace(path)
+
+
+# Builds the artifacts of the layout into target, contents are generated once for all the targets (cache).
+# Returns the status of every artifact: written, up to date, or stale (check only).
+@beartype
+def build(target: Path, layout: Dict[str, str], options: Dict[str, Any], cache: Dict[str, str], force: bool = False,
+          check: bool = False, stamp_path: Optional[Path] = None) -> Dict[str, str]:
+    stamp_path = stamp_path or target.joinpath('.obsidian', stamp_name)
+    stamp: Dict[str, Dict[str, str]] = json.loads(stamp_path.read_text(encoding='utf-8')) \
+        if stamp_path.is_file() else {}
+    statuses: Dict[str, str] = {}
+    for artifact in artifacts:
+        if artifact.name not in layout:
+            continue
+        out_path: Path = target.joinpath(layout[artifact.name])
+        key: str = artifact.key(options)
+        previous: Dict[str, str] = stamp.get(layout[artifact.name], {})
+        if not force and previous.get('key') == key and out_path.is_file() and \
+                hash_text(out_path.read_text(encoding='utf-8')) == previous.get('output'):
+            statuses[artifact.name] = 'up to date'
+            continue
+        if artifact.name not in cache:
+            cache[artifact.name] = artifact.make(options['minimize'])
+        text: str = cache[artifact.name]
+        if check:
+            up_to_date: bool = out_path.is_file() and out_path.read_text(encoding='utf-8') == text
+            statuses[artifact.name] = 'up to date' if up_to_date else 'stale'
+            continue
+        write_atomically(out_path, text)
+        stamp[layout[artifact.name]] = {'key': key, 'output': hash_text(text)}
+        statuses[artifact.name] = 'written'
+    if not check:
+        write_atomically(stamp_path, json.dumps(stamp, indent=1, sort_keys=True))
+    return statuses
+
+
+if __name__ == '__main__':
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description='Generate the rulesets, the pinyin rules and the css into obsidian vaults.')
+    parser.add_argument('vaults', type=Path, nargs='*', help='vault directories')
+    parser.add_argument('--regex-dir', default='.obsidian/regex_rulesets',
+                        help='rulesets directory in the vaults, depending on your regex pipeline settings')
+    parser.add_argument('--repo', action='store_true', help='also regenerate the artifacts committed in this repository')
+    parser.add_argument('--minimize-rules', action='store_true',
+                        help='drop the duplicated and shadowed pinyin rules (see typing_transformer_compiler.py)')
+    parser.add_argument('--force', action='store_true', help='regenerate even the up to date artifacts')
+    parser.add_argument('--check', action='store_true', help='only report the stale artifacts, exit 1 if any')
+    args: argparse.Namespace = parser.parse_args()
+
+    build_options: Dict[str, Any] = {'minimize': args.minimize_rules}
+    contents: Dict[str, str] = {}
+    targets: List[tuple] = [(vault, vault_layout(args.regex_dir), None) for vault in args.vaults]
+    if args.repo:
+        # The repository stamp is not committed: only the content comparison matters there
+        targets.append((repo_dir, repo_layout, repo_dir.joinpath('.git', stamp_name)))
+    if not targets:
+        parser.error('give vault directories and/or --repo')
+    stale: int = 0
+    for target, target_layout, target_stamp in targets:
+        if not target.is_dir():
+            raise Exception(f'argument is not a dir: {target}')
+        for name, status in build(target, target_layout, build_options, contents, args.force, args.check,
+                                  target_stamp).items():
+            print(f'{target}: {name}: {status}')
+            stale += status == 'stale'
+    sys.exit(1 if stale else 0)
@@ -0,0 +1,114 @@
+# MIT License
+#
+# Copyright (c) 2023 ESUNA - Sourigna SIMMALAVONG
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import argparse
+import re
+import sys
+from pathlib import Path
+
+from beartype import beartype
+from beartype.typing import Dict, Optional, Pattern
+
+# Derives the css of the compact html (see get_html_outputs in chinese_tone_generator.py) from chinese_tones.css, so
+# that both render the same. The compact html has no element around the ideogram: the .ideogram font size moves to the
+# .z container, and its margins become the padding of the container. The sup/sub font sizes and the container offset
+# are rescaled to the container font size, and the sup/sub get negative margins over the padding, so that a
+# translation wider than the ideogram does not widen the container.
+
+comment_pattern: Pattern = re.compile(r'/\*.*?\*/', re.DOTALL)
+css_rule_pattern: Pattern = re.compile(r'([^{}]+)\{([^{}]*)\}')
+tone_class_pattern: Pattern = re.compile(r'\.tone(\d)\b')
+compact_selectors: Dict[str, str] = {'.container': '.z', '.sup': '.z > sup', '.sub': '.z > sub'}
+
+
+# Declarations of every selector, in the order of their first rule; later declarations override the previous ones.
+@beartype
+def parse_css(css: str) -> Dict[str, Dict[str, str]]:
+    rules: Dict[str, Dict[str, str]] = {}
+    for match in css_rule_pattern.finditer(comment_pattern.sub('', css)):
+        declarations: Dict[str, str] = rules.setdefault(' '.join(match[1].split()), {})
+        for declaration in match[2].split(';'):
+            if declaration.strip():
+                name, value = declaration.split(':', 1)
+                declarations[name.strip()] = value.strip()
+    return rules
+
+
+@beartype
+def em(value: str) -> float:
+    if not value.endswith('em'):
+        raise Exception(f'Expected a length in em: {value}')
+    return float(value[:-2])
+
+
+@beartype
+def format_em(value: float) -> str:
+    return f'{round(value, 4):g}em'
+
+
+@beartype
+def format_css(rules: Dict[str, Dict[str, str]]) -> str:
+    return '\n'.join(f'{selector} {{\n' + ''.join(f'\t{name}: {value};\n' for name, value in declarations.items()) + '}'
+                     for selector, declarations in rules.items())
+
+
+@beartype
+def make_compact_css(css: str) -> str:
+    rules: Dict[str, Dict[str, str]] = parse_css(css)
+    ideogram: Dict[str, str] = rules.pop('.ideogram')
+    ideogram_size: float = em(ideogram.get('font-size', '1em'))
+    compact_rules: Dict[str, Dict[str, str]] = {}
+    for selector, declarations in rules.items():
+        declarations = dict(declarations)
+        if selector == '.container':
+            if 'top' in declarations:
+                declarations['top'] = format_em(em(declarations['top']) / ideogram_size)
+            declarations['font-size'] = format_em(ideogram_size)
+            declarations['text-align'] = ideogram.get('text-align', 'center')
+            for side in ['left', 'right']:
+                declarations[f'padding-{side}'] = ideogram.get(f'margin-{side}', '0em')
+        elif selector in ['.sup', '.sub']:
+            size: float = em(declarations.get('font-size', '1em')) / ideogram_size
+            declarations['font-size'] = format_em(size)
+            for side in ['left', 'right']:
+                declarations[f'margin-{side}'] = format_em(-em(ideogram.get(f'margin-{side}', '0em')) / size)
+        elif tone_class_pattern.search(selector):
+            compact_rules[tone_class_pattern.sub(r'.t\1', selector)] = declarations
+            continue
+        else:
+            raise Exception(f'Unknown selector: {selector}')
+        compact_rules[compact_selectors[selector]] = declarations
+    header: Optional[re.Match] = comment_pattern.match(css.lstrip())
+    return (f'{header.group()}\n\n' if header else '') + \
+        '/* Generated from chinese_tones.css by regex-rulesets/chinese_tone_css.py, for the compact rulesets */\n\n' + \
+        f'{format_css(compact_rules)}\n'
+
+
+if __name__ == '__main__':
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description='Print the css of the compact html rulesets, derived from chinese_tones.css.')
+    parser.add_argument('css', type=Path, nargs='?',
+                        default=Path(__file__).resolve().parent.parent.joinpath('.obsidian', 'chinese_tones.css'))
+    args: argparse.Namespace = parser.parse_args()
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    sys.stdout.write(make_compact_css(args.css.read_text(encoding='utf-8')))
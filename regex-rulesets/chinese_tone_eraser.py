@@ -0,0 +1,177 @@
+# MIT License
+#
+# Copyright (c) 2023 ESUNA - Sourigna SIMMALAVONG
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+from beartype import beartype
+from beartype.typing import List, Dict, Tuple, Iterator, Iterable, Pattern
+
+from chinese_tone_generator import get_html_inputs, edit_outputs, rules_to_edit, compact_rules_to_edit
+from chinese_tone_renderer import any_pinyin_word, pinyin_tone, find_entries, render, apply_rules, collect_notes
+
+# Python equivalent of the "Erase chinese tone.regex" ruleset, in a single scan of the text: both layouts are
+# alternatives of the same pattern, with a pinyin accepting every tone. Like the ruleset, that applies the rules tone
+# by tone, a pinyin mixing several tones is left as it is.
+
+container_starts: Dict[bool, str] = {False: "<span class='container", True: "<span class='z "}
+stream_chunk_size: int = 1 << 20
+
+
+@beartype
+def make_erase_pattern(compact: bool = False) -> Tuple[Pattern, List[int]]:
+    alternatives: List[str] = []
+    # first group of each layout
+    first_groups: List[int] = []
+    group_count: int = 0
+    for html_input in get_html_inputs(any_pinyin_word, compact):
+        first_groups.append(group_count + 1)
+        group_count += re.compile(html_input).groups
+        alternatives.append(html_input)
+    return re.compile('|'.join(alternatives)), first_groups
+
+
+erase_pattern: Pattern
+first_groups: List[int]
+erase_pattern, first_groups = make_erase_pattern()
+# Both html styles have the same groups, in the same order
+compact_erase_pattern: Pattern = make_erase_pattern(compact=True)[0]
+# templates[layout], with the groups $n as str.format fields
+templates: List[str] = [re.sub(r'\$(\d)', lambda group: f'{{{int(group[1]) - 1}}}', output) for output in edit_outputs]
+# Number of groups of each layout, the pinyin being the last one.
+group_counts: List[int] = [len(set(re.findall(r'\$\d', output))) for output in edit_outputs]
+
+
+# Called for every entry: not wrapped by beartype.
+def erase_entry(match: re.Match) -> str:
+    layout: int = 0 if match.start(first_groups[0]) >= 0 else 1
+    groups: Tuple[str, ...] = match.group(*range(first_groups[layout], first_groups[layout] + group_counts[layout]))
+    if pinyin_tone(groups[-1]) is None:
+        return match.group()
+    return templates[layout].format(*groups)
+
+
+@beartype
+def erase(text: str, compact: bool = False) -> str:
+    return (compact_erase_pattern if compact else erase_pattern).sub(erase_entry, text)
+
+
+# An entry never contains the start of another container: everything before the last container start of the buffer
+# can be erased, the rest waits for the next chunk.
+@beartype
+def erase_stream(chunks: Iterable[str], compact: bool = False) -> Iterator[str]:
+    container_start: str = container_starts[compact]
+    carry: str = ''
+    for chunk in chunks:
+        buffer: str = carry + chunk
+        cut: int = buffer.rfind(container_start)
+        if cut < 0:
+            cut = max(0, len(buffer) - len(container_start) + 1)
+        yield erase(buffer[:cut], compact)
+        carry = buffer[cut:]
+    yield erase(carry, compact)
+
+
+@beartype
+def read_chunks(path: Path) -> Iterator[str]:
+    with path.open('r', encoding='utf-8') as file:
+        while chunk := file.read(stream_chunk_size):
+            yield chunk
+
+
+class VerifyReport:
+    @beartype
+    def __init__(self):
+        self.notes: int = 0
+        self.entries: int = 0
+        self.failures: List[Tuple[Path, int, str]] = []  # note, line, raw entry
+        self.bytes: int = 0
+        self.render_seconds: float = 0
+        self.erase_seconds: float = 0
+
+
+# Renders then erases a note, and checks that every entry renders the same once erased.
+@beartype
+def verify_note(note: Path, report: VerifyReport, compact: bool = False):
+    text: str = note.read_text(encoding='utf-8')
+    start: float = time.perf_counter()
+    rendered: str = render(text, compact)
+    report.render_seconds += time.perf_counter() - start
+    start = time.perf_counter()
+    erase(rendered, compact)
+    report.erase_seconds += time.perf_counter() - start
+    report.notes += 1
+    report.bytes += len(text.encode('utf-8'))
+
+    for entry in find_entries(text):
+        report.entries += 1
+        html: str = entry.html(compact)
+        if render(erase(html, compact), compact) != html:
+            report.failures.append((note, text.count('\n', 0, entry.start) + 1, text[entry.start:entry.end]))
+
+
+if __name__ == '__main__':
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description='Erase the html rendering of notes back to (pinyin ideogram translation), '
+                    'like the "Erase chinese tone" regex ruleset.')
+    parser.add_argument('paths', type=Path, nargs='+', help='notes, or vault directories (searched for *.md)')
+    parser.add_argument('--in-place', action='store_true', help='rewrite the notes instead of printing them')
+    parser.add_argument('--check', action='store_true',
+                        help='only check that the output is the same as the regex ruleset')
+    parser.add_argument('--verify', action='store_true',
+                        help='render then erase every note, report the entries that do not round-trip')
+    parser.add_argument('--compact', action='store_true',
+                        help='erase the compact html, like the "Erase chinese tone compact" regex ruleset')
+    args: argparse.Namespace = parser.parse_args()
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    notes: List[Path] = collect_notes(args.paths)
+    if args.verify:
+        report: VerifyReport = VerifyReport()
+        for note in notes:
+            verify_note(note, report, args.compact)
+        for note, line, raw in report.failures:
+            print(f'{note}:{line}: does not round-trip: {raw}')
+        megabytes: float = report.bytes / 1e6
+        print(f'{report.notes} notes, {report.entries} entries, {len(report.failures)} not round-tripping')
+        print(f'render: {megabytes / max(report.render_seconds, 1e-9):.1f} MB/s, '
+              f'erase: {megabytes / max(report.erase_seconds, 1e-9):.1f} MB/s')
+        sys.exit(1 if report.failures else 0)
+
+    errors: int = 0
+    for note in notes:
+        if args.check:
+            text: str = note.read_text(encoding='utf-8')
+            if erase(text, args.compact) != apply_rules(text, compact_rules_to_edit if args.compact else rules_to_edit):
+                errors += 1
+                print(f'{note}: differs from the regex ruleset')
+        elif args.in_place:
+            tmp_path: Path = note.with_name(f'{note.name}.tmp')
+            with tmp_path.open('w', encoding='utf-8') as tmp_file:
+                tmp_file.writelines(erase_stream(read_chunks(note), args.compact))
+            tmp_path.replace(note)
+        else:
+            sys.stdout.writelines(erase_stream(read_chunks(note), args.compact))
+    sys.exit(1 if errors else 0)
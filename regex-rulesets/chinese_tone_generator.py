@@ -22,7 +22,7 @@
 
 
 from beartype import beartype
-from beartype.typing import List
+from beartype.typing import List, Tuple
 
 opening_parenthesis: str = r'[\(（]'
 closing_parenthesis: str = r'[\)）]'
@@ -39,53 +39,102 @@ def get_pinyin_word(tone: str) -> str:
     return fr'[a-zA-ZüÜ{tone}]+'
 
 
-rules_to_html: List[str] = []
-rules_to_edit: List[str] = []
-for index, tone in enumerate([tone_neutral, tone1, tone2, tone3, tone4]):
-    pinyin_word: str = get_pinyin_word(tone)
-    # pinyin_words: str = rf'{pinyin_word}[\s+{pinyin_word}]*'
-    cjk_range: str = '\u4e00-\u9fff'
-    translation_character: str = fr'{cjk_range}a-zA-Z0-9\-\_\/\|\[\]\'\\āēīōūĀĒĪŌŪáéíóúÁÉÍÓÚǎěǐǒǔǍĚǏǑǓàèìòùÀÈÌÒÙäëïöüÄËÏÖÜâêîôûÂÊÎÔÛçÇ'
-    translation_proposition: str = fr'[{translation_character}]+[\s{translation_character}]*'
-    # translation_propositions: str = fr'/{translation_proposition}(?<=/){translation_proposition}*/'
-
-    tone_index: int = index  # + 1
-
-    ######################################
-    # writing to html
-
-    # Using single quotes instead of double quotes so that we can also use it in frontmatter metadata for dataview.
-
-    # (ideogram pinyin translation)
-    chinese_edit_input1: str = f'{opening_parenthesis}({ideogram})\s+({pinyin_word})\s+({translation_proposition}){closing_parenthesis}'
-    chinese_html_output1: str = fr"<span class='container tone{tone_index}'><span class='sup'>$3</span><span class='ideogram'>$1</span><span class='sub'>$2</span></span>"
-    # (pinyin ideogram translation)
-    chinese_edit_input2: str = f'{opening_parenthesis}({pinyin_word})\s+({ideogram})\s+({translation_proposition}){closing_parenthesis}'
-    chinese_html_output2: str = fr"<span class='container tone{tone_index}'><span class='sup'>$3</span><span class='ideogram'>$2</span><span class='sub'>$1</span></span>"
-    # (ideogram pinyin)
-    chinese_edit_input3: str = f'{opening_parenthesis}({ideogram})\s+({pinyin_word}){closing_parenthesis}'
-    chinese_html_output3: str = fr"<span class='container tone{tone_index}'><span class='ideogram'>$1</span><span class='sub'>$2</span></span>"
-    # (pinyin ideogram)
-    chinese_edit_input4: str = f'{opening_parenthesis}({pinyin_word})\s+({ideogram}){closing_parenthesis}'
-    chinese_html_output4: str = fr"<span class='container tone{tone_index}'><span class='ideogram'>$2</span><span class='sub'>$1</span></span>"
-
-    ######################################
-    # html to writing
-    tone_range: str = '[0-4]'
-
-    # (pinyin ideogram translation)
-    chinese_html_input2: str = fr"<span class='container tone{tone_range}'><span class='sup'>({translation_proposition})</span><span class='ideogram'>({ideogram})</span><span class='sub'>({pinyin_word})</span></span>"
-    chinese_edit_output2: str = f'($3 $2 $1)'
-    # (pinyin ideogram)
-    chinese_html_input4: str = fr"<span class='container tone{tone_range}'><span class='ideogram'>({ideogram})</span><span class='sub'>({pinyin_word})</span></span>"
-    chinese_edit_output4: str = f'($2 $1)'
-
-    rules_to_html += [f""""{chinese_edit_input1}"->"{chinese_html_output1}\"""",
-                      f""""{chinese_edit_input2}"->"{chinese_html_output2}\"""",
-                      f""""{chinese_edit_input3}"->"{chinese_html_output3}\"""",
-                      f""""{chinese_edit_input4}"->"{chinese_html_output4}\""""]
-    rules_to_edit += [f""""{chinese_html_input2}"->"{chinese_edit_output2}\"""",
-                      f""""{chinese_html_input4}"->"{chinese_edit_output4}\""""]
+cjk_range: str = '\u4e00-\u9fff'
+translation_character: str = fr'{cjk_range}a-zA-Z0-9\-\_\/\|\[\]\'\\āēīōūĀĒĪŌŪáéíóúÁÉÍÓÚǎěǐǒǔǍĚǏǑǓàèìòùÀÈÌÒÙäëïöüÄËÏÖÜâêîôûÂÊÎÔÛçÇ'
+# One character then any: the same language as [...]+[\s...]*, without the quadratic backtracking over the split
+# between the two repetitions when the closing parenthesis is missing (see regex_profiler.py).
+translation_proposition: str = fr'[{translation_character}][\s{translation_character}]*'
+# translation_propositions: str = fr'/{translation_proposition}(?<=/){translation_proposition}*/'
+tones: List[str] = [tone_neutral, tone1, tone2, tone3, tone4]
+
+
+######################################
+# writing to html
+
+# Using single quotes instead of double quotes so that we can also use it in frontmatter metadata for dataview.
+
+@beartype
+def get_edit_inputs(pinyin_word: str) -> List[str]:
+    return [
+        # (ideogram pinyin translation)
+        f'{opening_parenthesis}({ideogram})\s+({pinyin_word})\s+({translation_proposition}){closing_parenthesis}',
+        # (pinyin ideogram translation)
+        f'{opening_parenthesis}({pinyin_word})\s+({ideogram})\s+({translation_proposition}){closing_parenthesis}',
+        # (ideogram pinyin)
+        f'{opening_parenthesis}({ideogram})\s+({pinyin_word}){closing_parenthesis}',
+        # (pinyin ideogram)
+        f'{opening_parenthesis}({pinyin_word})\s+({ideogram}){closing_parenthesis}',
+    ]
+
+
+# Compact html: short class names and no element around the ideogram, less than half the size of the html above.
+# z is the container and tN the tone color, see chinese_tone_css.py for the matching css.
+@beartype
+def get_html_outputs(tone_index: int, compact: bool = False) -> List[str]:
+    if compact:
+        return [
+            fr"<span class='z t{tone_index}'><sup>$3</sup>$1<sub>$2</sub></span>",
+            fr"<span class='z t{tone_index}'><sup>$3</sup>$2<sub>$1</sub></span>",
+            fr"<span class='z t{tone_index}'>$1<sub>$2</sub></span>",
+            fr"<span class='z t{tone_index}'>$2<sub>$1</sub></span>",
+        ]
+    return [
+        fr"<span class='container tone{tone_index}'><span class='sup'>$3</span><span class='ideogram'>$1</span><span class='sub'>$2</span></span>",
+        fr"<span class='container tone{tone_index}'><span class='sup'>$3</span><span class='ideogram'>$2</span><span class='sub'>$1</span></span>",
+        fr"<span class='container tone{tone_index}'><span class='ideogram'>$1</span><span class='sub'>$2</span></span>",
+        fr"<span class='container tone{tone_index}'><span class='ideogram'>$2</span><span class='sub'>$1</span></span>",
+    ]
+
+
+######################################
+# html to writing
+tone_range: str = '[0-4]'
+
+
+@beartype
+def get_html_inputs(pinyin_word: str, compact: bool = False) -> List[str]:
+    if compact:
+        return [
+            # (pinyin ideogram translation)
+            fr"<span class='z t{tone_range}'><sup>({translation_proposition})</sup>({ideogram})<sub>({pinyin_word})</sub></span>",
+            # (pinyin ideogram)
+            fr"<span class='z t{tone_range}'>({ideogram})<sub>({pinyin_word})</sub></span>",
+        ]
+    return [
+        # (pinyin ideogram translation)
+        fr"<span class='container tone{tone_range}'><span class='sup'>({translation_proposition})</span><span class='ideogram'>({ideogram})</span><span class='sub'>({pinyin_word})</span></span>",
+        # (pinyin ideogram)
+        fr"<span class='container tone{tone_range}'><span class='ideogram'>({ideogram})</span><span class='sub'>({pinyin_word})</span></span>",
+    ]
+
+
+edit_outputs: List[str] = ['($3 $2 $1)', '($2 $1)']
+
+
+@beartype
+def make_rule(input: str, output: str) -> str:
+    return f""""{input}"->"{output}\""""
+
+
+@beartype
+def make_tone_rules(compact: bool = False) -> Tuple[List[str], List[str]]:
+    rules_to_html: List[str] = []
+    rules_to_edit: List[str] = []
+    for tone_index, tone in enumerate(tones):
+        pinyin_word: str = get_pinyin_word(tone)
+        rules_to_html += [make_rule(input, output) for input, output in zip(get_edit_inputs(pinyin_word),
+                                                                            get_html_outputs(tone_index, compact))]
+        rules_to_edit += [make_rule(input, output) for input, output in zip(get_html_inputs(pinyin_word, compact),
+                                                                            edit_outputs)]
+    return rules_to_html, rules_to_edit
+
+
+rules_to_html: List[str]
+rules_to_edit: List[str]
+rules_to_html, rules_to_edit = make_tone_rules()
+compact_rules_to_html: List[str]
+compact_rules_to_edit: List[str]
+compact_rules_to_html, compact_rules_to_edit = make_tone_rules(compact=True)
 
 if __name__ == '__main__':
     for rule in rules_to_html:
@@ -0,0 +1,236 @@
+# MIT License
+#
+# Copyright (c) 2023 ESUNA - Sourigna SIMMALAVONG
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import argparse
+import re
+import sys
+from pathlib import Path
+
+from beartype import beartype
+from beartype.typing import List, Dict, Optional, Tuple, Iterator, Pattern, Set
+
+from chinese_tone_generator import get_edit_inputs, get_html_outputs, get_pinyin_word, opening_parenthesis, tones, \
+    rules_to_html, compact_rules_to_html
+from tone_analysis import ToneAnalysis, analyze_pinyins
+
+# Python equivalent of the "Chinese tone.regex" ruleset, in a single scan of the text instead of 20 successive ones.
+#
+# Every opening parenthesis is tried against the 4 layouts at once (one optional lookahead per layout), with a pinyin
+# accepting every tone. The tone of the pinyin is then looked up and, like the ruleset that applies the rules tone by
+# tone and layout by layout, the lowest (tone, layout) wins. A pinyin mixing several tones is not rendered.
+
+tone_of: Dict[str, int] = {character: tone_index for tone_index, tone in enumerate(tones) for character in tone}
+any_pinyin_word: str = get_pinyin_word(''.join(tones))
+
+
+@beartype
+def make_render_pattern() -> Tuple[Pattern, List[Tuple[int, int, int]]]:
+    pattern: str = opening_parenthesis
+    # (lookahead group, first group of the layout, number of groups of the layout)
+    layout_groups: List[Tuple[int, int, int]] = []
+    group_count: int = 0
+    for edit_input in get_edit_inputs(any_pinyin_word):
+        if not edit_input.startswith(opening_parenthesis):
+            raise Exception(f'Unexpected rule input: {edit_input}')
+        body: str = edit_input[len(opening_parenthesis):]
+        body_groups: int = re.compile(body).groups
+        layout_groups.append((group_count + 1, group_count + 2, body_groups))
+        group_count += 1 + body_groups
+        pattern += f'(?=({body}))?'
+    return re.compile(pattern), layout_groups
+
+
+render_pattern: Pattern
+layout_groups: List[Tuple[int, int, int]]
+render_pattern, layout_groups = make_render_pattern()
+# Index of the pinyin among the groups ($1, $2, $3) of each layout.
+pinyin_group: List[int] = [2, 1, 2, 1]
+
+
+@beartype
+def make_templates(compact: bool) -> List[List[str]]:
+    return [[re.sub(r'\$(\d)', lambda group: f'{{{int(group[1]) - 1}}}', output)
+             for output in get_html_outputs(tone_index, compact)]
+            for tone_index in range(len(tones))]
+
+
+# templates[tone][layout], with the groups $n as str.format fields
+templates: List[List[str]] = make_templates(compact=False)
+compact_templates: List[List[str]] = make_templates(compact=True)
+# Class of the tone colors, for the syllables (see render_syllables)
+tone_classes: Dict[bool, str] = {False: 'tone', True: 't'}
+
+
+# Called for each candidate layout of each entry: not wrapped by beartype.
+def pinyin_tone(pinyin: str) -> Optional[int]:
+    found: Set[Optional[int]] = set(map(tone_of.get, pinyin))
+    found.discard(None)
+    if len(found) > 1:
+        return None
+    return found.pop() if found else 0
+
+
+# One per rendered entry: not wrapped by beartype.
+class RenderedEntry:
+    __slots__ = ('start', 'end', 'tone', 'layout', 'groups')
+
+    def __init__(self, start: int, end: int, tone: int, layout: int, groups: Tuple[str, ...]):
+        self.start: int = start
+        self.end: int = end
+        self.tone: int = tone
+        self.layout: int = layout
+        self.groups: Tuple[str, ...] = groups  # $1, $2, ($3)
+
+    def html(self, compact: bool = False) -> str:
+        return (compact_templates if compact else templates)[self.tone][self.layout].format(*self.groups)
+
+
+# With mixed_tones, pinyins mixing several tones are rendered too (as tone0), after every other layout.
+@beartype
+def find_entries(text: str, mixed_tones: bool = False) -> Iterator[RenderedEntry]:
+    position: int = 0
+    for match in render_pattern.finditer(text):
+        if match.start() < position:  # inside the previous entry
+            continue
+        best: Optional[Tuple[int, int]] = None
+        for layout, (lookahead_group, first_group, _) in enumerate(layout_groups):
+            if match.start(lookahead_group) < 0:
+                continue
+            tone: Optional[int] = pinyin_tone(match.group(first_group + pinyin_group[layout] - 1))
+            if tone is None and mixed_tones:
+                tone = len(tones)
+            if tone is not None and (best is None or (tone, layout) < best):
+                best = (tone, layout)
+        if best is None:
+            continue
+        tone, layout = best
+        lookahead_group, first_group, group_count = layout_groups[layout]
+        position = match.end(lookahead_group)
+        yield RenderedEntry(match.start(), position, tone % len(tones), layout,
+                            match.group(*range(first_group, first_group + group_count)))
+
+
+@beartype
+def render(text: str, compact: bool = False) -> str:
+    parts: List[str] = []
+    position: int = 0
+    for entry in find_entries(text):
+        parts.append(text[position:entry.start])
+        parts.append(entry.html(compact))
+        position = entry.end
+    parts.append(text[position:])
+    return ''.join(parts)
+
+
+# Called for every entry: not wrapped by beartype.
+def color_syllables(pinyin: str, starts: List[int], ends: List[int], syllable_tones: List[int],
+                    tone_class: str = 'tone') -> str:
+    parts: List[str] = []
+    position: int = 0
+    for start, end, tone in zip(starts, ends, syllable_tones):
+        parts.append(pinyin[position:start])
+        parts.append(f"<span class='{tone_class}{tone}'>{pinyin[start:end]}</span>")
+        position = end
+    parts.append(pinyin[position:])
+    return ''.join(parts)
+
+
+# Same as render, but each syllable of the pinyin gets its own tone color, mixed tones included.
+# The erase ruleset does not recognize this output.
+@beartype
+def render_syllables(text: str, compact: bool = False) -> str:
+    entries: List[RenderedEntry] = list(find_entries(text, mixed_tones=True))
+    analysis: ToneAnalysis = analyze_pinyins([entry.groups[pinyin_group[entry.layout] - 1] for entry in entries])
+    starts: List[int] = analysis.starts.tolist()
+    ends: List[int] = analysis.ends.tolist()
+    syllable_tones: List[int] = analysis.tones.tolist()
+    word_offsets: List[int] = analysis.word_offsets.tolist()
+    parts: List[str] = []
+    position: int = 0
+    for entry_index, entry in enumerate(entries):
+        group: int = pinyin_group[entry.layout] - 1
+        syllables: slice = slice(word_offsets[entry_index], word_offsets[entry_index + 1])
+        groups: List[str] = list(entry.groups)
+        groups[group] = color_syllables(groups[group], starts[syllables], ends[syllables], syllable_tones[syllables],
+                                        tone_classes[compact])
+        parts.append(text[position:entry.start])
+        parts.append((compact_templates if compact else templates)[entry.tone][entry.layout].format(*groups))
+        position = entry.end
+    parts.append(text[position:])
+    return ''.join(parts)
+
+
+# Reference implementation: applies the rules one after the other, like Regex Pipeline does.
+@beartype
+def parse_rule(rule: str) -> Tuple[Pattern, str]:
+    input: str
+    output: str
+    input, output = rule[1:-1].split('"->"')
+    return re.compile(input), re.sub(r'\$(\d)', r'\\g<\1>', output)
+
+
+@beartype
+def apply_rules(text: str, rules: List[str]) -> str:
+    for rule in rules:
+        pattern: Pattern
+        output: str
+        pattern, output = parse_rule(rule)
+        text = pattern.sub(output, text)
+    return text
+
+
+@beartype
+def collect_notes(paths: List[Path]) -> List[Path]:
+    notes: List[Path] = []
+    for path in paths:
+        notes += sorted(path.rglob('*.md')) if path.is_dir() else [path]
+    return notes
+
+
+if __name__ == '__main__':
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description='Render (ideogram pinyin translation) notes to html, like the "Chinese tone" regex ruleset.')
+    parser.add_argument('paths', type=Path, nargs='+', help='notes, or vault directories (searched for *.md)')
+    parser.add_argument('--in-place', action='store_true', help='rewrite the notes instead of printing them')
+    parser.add_argument('--check', action='store_true',
+                        help='only check that the output is the same as the regex ruleset')
+    parser.add_argument('--syllables', action='store_true',
+                        help='color each syllable of the pinyins with its own tone (not reversible by the erase rules)')
+    parser.add_argument('--compact', action='store_true',
+                        help='compact html, like the "Chinese tone compact" regex ruleset (chinese_tones_compact.css)')
+    args: argparse.Namespace = parser.parse_args()
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    errors: int = 0
+    for note in collect_notes(args.paths):
+        text: str = note.read_text(encoding='utf-8')
+        rendered: str = render_syllables(text, args.compact) if args.syllables else render(text, args.compact)
+        if args.check:
+            if rendered != apply_rules(text, compact_rules_to_html if args.compact else rules_to_html):
+                errors += 1
+                print(f'{note}: differs from the regex ruleset')
+        elif args.in_place:
+            if rendered != text:
+                note.write_text(rendered, encoding='utf-8')
+        else:
+            sys.stdout.write(rendered)
+    sys.exit(1 if errors else 0)
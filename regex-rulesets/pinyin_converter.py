@@ -0,0 +1,164 @@
+# MIT License
+#
+# Copyright (c) 2023 ESUNA - Sourigna SIMMALAVONG
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import argparse
+import re
+import sys
+from functools import lru_cache
+from pathlib import Path
+
+from beartype import beartype
+from beartype.typing import List, Dict, Iterable, Iterator, Match, Pattern
+
+from tone_analysis import all_tones, umlaut_tones, syllable_pattern
+from typing_transformer_rules_generator import toned_characters, untoned_characters_indices
+
+# Numbered pinyin (ni3 hao3, lu:4, lv4) <-> pinyin with tone marks (nǐ hǎo, lǜ).
+# Conversions are cached per syllable / word: a text only has a few hundred distinct ones.
+
+# [vowel] -> [tone 1, tone 2, tone 3, tone 4]
+tone_marks: Dict[str, List[str]] = {}
+for vowel, vowel_index in untoned_characters_indices.items():
+    tone_marks[vowel] = list(toned_characters[vowel_index][0])
+    tone_marks[vowel.upper()] = list(toned_characters[vowel_index][1])
+tone_marks['ü'] = [umlaut_tone[0] for umlaut_tone in umlaut_tones[1:]]
+tone_marks['Ü'] = [umlaut_tone[1] for umlaut_tone in umlaut_tones[1:]]
+tone_of_mark: Dict[str, int] = {character: tone for tone in range(1, 5) for character in all_tones[tone]}
+untone_of_mark: Dict[str, str] = {mark: vowel for vowel, marks in tone_marks.items() for mark in marks}
+
+letters: str = 'A-Za-züÜ'
+numbered_syllable: str = fr'(?<![{letters}:])((?:[{letters}]|(?<=[uU]):)+)([0-5])(?![0-9])'
+numbered_syllable_pattern: Pattern = re.compile(numbered_syllable)
+# Numbered syllables separated by spaces (ni3 hao3), joined into one word if asked
+numbered_run_pattern: Pattern = re.compile(fr'{numbered_syllable}(?:[ \t]+{numbered_syllable})*')
+marked_word_pattern: Pattern = re.compile(fr"[{letters}{''.join(tone_of_mark)}]+")
+
+
+# Standard placement: on a or e, on the o of ou, otherwise on the last vowel (liù, guì).
+# Called for every syllable: cached, not wrapped by beartype.
+@lru_cache(maxsize=None)
+def to_marked_syllable(syllable: str, tone: int) -> str:
+    syllable = syllable.replace('u:', 'ü').replace('U:', 'Ü').replace('v', 'ü').replace('V', 'Ü')
+    if not syllable_pattern.fullmatch(syllable):
+        return ''
+    if tone in [0, 5]:
+        return syllable
+    lower: str = syllable.lower()
+    index: int
+    if 'a' in lower:
+        index = lower.index('a')
+    elif 'e' in lower:
+        index = lower.index('e')
+    elif 'ou' in lower:
+        index = lower.index('o')
+    else:
+        index = max(lower.rfind(vowel) for vowel in 'iouü')
+    return syllable[:index] + tone_marks[syllable[index]][tone - 1] + syllable[index + 1:]
+
+
+# Not wrapped by beartype: called for every match.
+def replace_numbered_syllable(match: Match) -> str:
+    return to_marked_syllable(match.group(1), int(match.group(2))) or match.group()
+
+
+# Joined only if every syllable of the run is valid
+def join_numbered_run(match: Match) -> str:
+    syllables: List[str] = [to_marked_syllable(syllable.group(1), int(syllable.group(2)))
+                            for syllable in numbered_syllable_pattern.finditer(match.group())]
+    if all(syllables):
+        return ''.join(syllables)
+    return numbered_syllable_pattern.sub(replace_numbered_syllable, match.group())
+
+
+# 'ni3 hao3' -> 'nǐ hǎo', or 'nǐhǎo' with join. Invalid syllables (mp3) are left as is.
+@beartype
+def to_marks(text: str, join: bool = False) -> str:
+    if join:
+        return numbered_run_pattern.sub(join_numbered_run, text)
+    return numbered_syllable_pattern.sub(replace_numbered_syllable, text)
+
+
+# 'nǐhǎo' -> 'ni3hao3', neutral syllables get 5: 'péngyou' -> 'peng2you5'.
+# Only words with a tone mark and made of pinyin syllables only are converted (which still includes a few french
+# words: café -> ca5fe2).
+# Called for every word: cached, not wrapped by beartype.
+@lru_cache(maxsize=None)
+def to_numbered_word(word: str, umlaut: str = 'u:', separator: str = '') -> str:
+    untoned: str = ''.join(untone_of_mark.get(character, character) for character in word)
+    if untoned == word:
+        return word
+    syllables: List[str] = []
+    end: int = 0
+    for match in syllable_pattern.finditer(untoned):
+        if match.start() != end:
+            return word
+        end = match.end()
+        tone: int = max((tone_of_mark.get(character, 0) for character in word[match.start():match.end()]))
+        syllable: str = match.group().replace('ü', umlaut).replace('Ü', umlaut.upper())
+        syllables.append(f'{syllable}{tone or 5}')
+    return separator.join(syllables) if end == len(word) else word
+
+
+@beartype
+def to_numbers(text: str, umlaut: str = 'u:', separator: str = '') -> str:
+    return marked_word_pattern.sub(lambda match: to_numbered_word(match.group(), umlaut, separator), text)
+
+
+@beartype
+def convert_lines(lines: Iterable[str], to: str = 'marks', join: bool = False, umlaut: str = 'u:',
+                  separator: str = '') -> Iterator[str]:
+    for line in lines:
+        yield to_marks(line, join) if to == 'marks' else to_numbers(line, umlaut, separator)
+
+
+@beartype
+def read_lines(path: Path) -> Iterator[str]:
+    if path == Path('-'):
+        yield from sys.stdin
+        return
+    with path.open(encoding='utf-8') as file:
+        yield from file
+
+
+if __name__ == '__main__':
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description='Convert numbered pinyin (ni3 hao3) to tone marks (nǐ hǎo), or back.')
+    parser.add_argument('paths', type=Path, nargs='+', help='text files, - reads stdin')
+    parser.add_argument('--to', choices=['marks', 'numbers'], default='marks')
+    parser.add_argument('--join', action='store_true',
+                        help='join numbered syllables separated by spaces into one word: ni3 hao3 -> nǐhǎo')
+    parser.add_argument('--umlaut', choices=['u:', 'v', 'ü'], default='u:', help='how numbers write ü')
+    parser.add_argument('--separator', default='', help='between the numbered syllables of a word')
+    parser.add_argument('--in-place', action='store_true', help='rewrite the files instead of printing them')
+    args: argparse.Namespace = parser.parse_args()
+    sys.stdin.reconfigure(encoding='utf-8')
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    for path in args.paths:
+        converted: Iterator[str] = convert_lines(read_lines(path), args.to, args.join, args.umlaut, args.separator)
+        if args.in_place and path != Path('-'):
+            tmp_path: Path = path.with_name(f'{path.name}.tmp')
+            with tmp_path.open('w', encoding='utf-8') as tmp_file:
+                tmp_file.writelines(converted)
+            tmp_path.replace(path)
+        else:
+            sys.stdout.writelines(converted)
@@ -0,0 +1,158 @@
+# MIT License
+#
+# Copyright (c) 2023 ESUNA - Sourigna SIMMALAVONG
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import argparse
+import math
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from beartype import beartype
+from beartype.typing import List, Dict, Callable, Tuple, Pattern
+
+from chinese_tone_generator import rules_to_html, rules_to_edit
+from chinese_tone_renderer import parse_rule
+
+# Times every generated rule over adversarial inputs of growing length (mostly unclosed entries, which make a
+# backtracking engine retry every split of the translation), and estimates the growth exponent of the time.
+# The regex pipeline runs the rules with the javascript engine, python's re backtracks the same way.
+
+# One pinyin of every tone, each rule only matching its own tone
+tone_pinyins: List[str] = ['ni', 'nī', 'ní', 'nǐ', 'nì']
+
+
+# Adversarial inputs of length ~n, one part per tone
+@beartype
+def per_tone(make_part: Callable[[str, int], str]) -> Callable[[int], str]:
+    return lambda n: ''.join(make_part(pinyin, n // len(tone_pinyins)) for pinyin in tone_pinyins)
+
+
+adversarial_inputs: Dict[str, Callable[[int], str]] = {
+    'unclosed translation': per_tone(lambda pinyin, n: f'(你 {pinyin} ' + 'a' * n),
+    'unclosed translation, pinyin first': per_tone(lambda pinyin, n: f'({pinyin} 你 ' + 'a' * n),
+    'unclosed translation with spaces': per_tone(lambda pinyin, n: f'(你 {pinyin} ' + 'ab ' * (n // 3)),
+    'unclosed html translation': per_tone(
+        lambda pinyin, n: "<span class='container tone3'><span class='sup'>" + 'a' * n),
+    'unclosed pinyin': per_tone(lambda pinyin, n: '(' + pinyin * (n // len(pinyin))),
+    'opening parentheses': per_tone(lambda pinyin, n: f'(你 {pinyin}' * (n // 5)),
+    'long closed entry': per_tone(lambda pinyin, n: f'(你 {pinyin} ' + 'ab ' * (n // 3) + ')'),
+}
+min_length: int = 1000
+max_length: int = 256000
+time_budget: float = 0.1  # seconds, the length stops doubling above it
+min_measurable: float = 10e-3  # seconds, shorter times are too noisy to fit
+min_fitted_points: int = 3  # fewer measurable points: too noisy to tell, deemed linear
+superlinear_exponent: float = 1.5
+
+
+@beartype
+def time_rule(pattern: Pattern, output: str, text: str, repeat: int = 5) -> float:
+    times: List[float] = []
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        pattern.sub(output, text)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+# Doubles the length until the time budget, returns the (length, seconds) measures
+@beartype
+def measure(pattern: Pattern, output: str, make_input: Callable[[int], str]) -> List[Tuple[int, float]]:
+    measures: List[Tuple[int, float]] = []
+    length: int = min_length
+    while length <= max_length:
+        seconds: float = time_rule(pattern, output, make_input(length))
+        measures.append((length, seconds))
+        if seconds > time_budget:
+            break
+        length *= 2
+    return measures
+
+
+# Least squares slope of log(time) over log(length) of the measurable points, 1 if too few to tell
+@beartype
+def growth_exponent(measures: List[Tuple[int, float]]) -> float:
+    points: List[Tuple[float, float]] = [(math.log(length), math.log(seconds)) for length, seconds in measures
+                                         if seconds >= min_measurable]
+    if len(points) < min_fitted_points:
+        return 1.0
+    return statistics.linear_regression([x for x, _ in points], [y for _, y in points]).slope
+
+
+class RuleProfile:
+    @beartype
+    def __init__(self, name: str, rule: str, input_name: str, measures: List[Tuple[int, float]]):
+        self.name: str = name
+        self.rule: str = rule
+        self.input_name: str = input_name
+        self.measures: List[Tuple[int, float]] = measures
+        self.exponent: float = growth_exponent(measures)
+
+    @property
+    def superlinear(self) -> bool:
+        return self.exponent > superlinear_exponent
+
+
+@beartype
+def profile_rules(rules: Dict[str, str], inputs: Dict[str, Callable[[int], str]]) -> List[RuleProfile]:
+    profiles: List[RuleProfile] = []
+    for name, rule in rules.items():
+        pattern: Pattern
+        output: str
+        pattern, output = parse_rule(rule)
+        for input_name, make_input in inputs.items():
+            profiles.append(RuleProfile(name, rule, input_name, measure(pattern, output, make_input)))
+    return profiles
+
+
+@beartype
+def generated_rules() -> Dict[str, str]:
+    rules: Dict[str, str] = {f'Chinese tone.regex:{index + 1}': rule for index, rule in enumerate(rules_to_html)}
+    rules.update({f'Erase chinese tone.regex:{index + 1}': rule for index, rule in enumerate(rules_to_edit)})
+    return rules
+
+
+if __name__ == '__main__':
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description='Time the generated regex rules on adversarial inputs of growing length.')
+    parser.add_argument('--check', action='store_true',
+                        help='only report the superlinear rules, exit 1 if any (regression check)')
+    parser.add_argument('--rule-files', nargs='*', default=[],
+                        help='profile these rulesets ("input"->"output" lines) instead of the generated rules')
+    args: argparse.Namespace = parser.parse_args()
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    profiled_rules: Dict[str, str] = generated_rules()
+    if args.rule_files:
+        profiled_rules = {f'{path}:{index + 1}': rule for path in args.rule_files
+                          for index, rule in enumerate(Path(path).read_text(encoding='utf-8').splitlines()) if rule}
+    rule_profiles: List[RuleProfile] = profile_rules(profiled_rules, adversarial_inputs)
+    for rule_profile in rule_profiles:
+        if args.check and not rule_profile.superlinear:
+            continue
+        length, seconds = rule_profile.measures[-1]
+        print(f'{rule_profile.name}: {rule_profile.input_name}: exponent {rule_profile.exponent:.2f}, '
+              f'{seconds * 1000:.1f} ms at length {length}' + (' SUPERLINEAR' if rule_profile.superlinear else ''))
+    superlinear: int = sum(rule_profile.superlinear for rule_profile in rule_profiles)
+    print(f'{len(profiled_rules)} rules, {superlinear} superlinear measure(s)')
+    sys.exit(1 if superlinear else 0)
@@ -0,0 +1,134 @@
+# MIT License
+#
+# Copyright (c) 2023 ESUNA - Sourigna SIMMALAVONG
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import re
+
+import numpy as np
+from beartype import beartype
+from beartype.typing import List, Tuple, Pattern, Dict
+from numpy._typing import NDArray
+
+from chinese_tone_generator import tones
+
+# Per-syllable tones of pinyin words, computed for a whole list of words at once:
+# - the tone of every character is looked up in a table indexed by code point (the tone1..tone4 tables),
+# - the syllables are found by a single regex scan over all the words, with the tones removed,
+# - the tone of a syllable is the max of the tones of its characters (np.maximum.reduceat).
+
+# The tone tables do not have the toned ü (not typed by the pinyin rules either), they are still valid pinyin.
+umlaut_tones: List[str] = ['', 'ǖǕ', 'ǘǗ', 'ǚǙ', 'ǜǛ']
+all_tones: List[str] = [tone + umlaut_tone for tone, umlaut_tone in zip(tones, umlaut_tones)]
+# Same length translation, so that the syllable offsets found on the untoned text are valid on the original one.
+untone_table: dict = str.maketrans(''.join(all_tones), ''.join(all_tones[0]) + ('aeiouAEIOUüÜ' * 4))
+tone_table: NDArray = np.zeros(max(map(ord, ''.join(all_tones))) + 1, dtype=np.int8)
+for tone_index, tone in enumerate(all_tones):
+    tone_table[[ord(character) for character in tone]] = tone_index
+
+initials: List[str] = ['zh', 'ch', 'sh', 'b', 'p', 'm', 'f', 'd', 't', 'n', 'l', 'g', 'k', 'h', 'j', 'q', 'x', 'r', 'z',
+                       'c', 's', 'y', 'w']
+finals: List[str] = ['iang', 'iong', 'uang', 'ueng', 'ang', 'eng', 'ing', 'ong', 'ian', 'iao', 'uai', 'uan', 'üan',
+                     'van', 'ai', 'ei', 'ao', 'ou', 'an', 'en', 'in', 'un', 'ün', 'vn', 'er', 'ia', 'ie', 'iu', 'ua',
+                     'ue', 'ui', 'uo', 'üe', 've', 'a', 'e', 'i', 'o', 'u', 'ü', 'v']
+vowels: str = 'aeiouüv'
+
+
+@beartype
+def make_syllable_pattern() -> Pattern:
+    # A final ending with a consonant does not take the vowel of the next syllable: xian, not xi-an; but ta-nan
+    finals_patterns: List[str] = [f'{final}(?![{vowels}])' if final[-1] in 'nr' or final.endswith('ng') else final
+                                  for final in sorted(finals, key=len, reverse=True)]
+    return re.compile(f"(?:{'|'.join(initials)})?(?:{'|'.join(finals_patterns)})", re.IGNORECASE)
+
+
+syllable_pattern: Pattern = make_syllable_pattern()
+
+
+class ToneAnalysis:
+    @beartype
+    def __init__(self, tones: NDArray, starts: NDArray, ends: NDArray, word_offsets: NDArray):
+        self.tones: NDArray = tones  # tone of every syllable, 0 for neutral
+        self.starts: NDArray = starts  # start of every syllable in its word
+        self.ends: NDArray = ends  # end of every syllable in its word
+        self.word_offsets: NDArray = word_offsets  # syllables of word i: [word_offsets[i], word_offsets[i + 1])
+
+    def __len__(self) -> int:
+        return len(self.word_offsets) - 1
+
+    @beartype
+    def word_tones(self, index: int) -> NDArray:
+        return self.tones[self.word_offsets[index]:self.word_offsets[index + 1]]
+
+    @beartype
+    def word_spans(self, index: int) -> List[Tuple[int, int]]:
+        syllables: slice = slice(self.word_offsets[index], self.word_offsets[index + 1])
+        return list(zip(self.starts[syllables].tolist(), self.ends[syllables].tolist()))
+
+
+@beartype
+def analyze_unique_pinyins(pinyins: List[str]) -> ToneAnalysis:
+    # Joined with a separator no syllable can contain.
+    text: str = '\n'.join(pinyins)
+    codepoints: NDArray = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    in_table: NDArray = codepoints < len(tone_table)
+    character_tones: NDArray = np.where(in_table, tone_table[np.where(in_table, codepoints, 0)], 0).astype(np.int8)
+
+    spans: NDArray = np.array([match.span() for match in syllable_pattern.finditer(text.translate(untone_table))],
+                              dtype=np.int64).reshape(-1, 2)
+    if len(spans):
+        # max over [start, end) of each syllable: the odd reductions ([end, next start)) are dropped.
+        syllable_tones: NDArray = np.maximum.reduceat(np.append(character_tones, 0), spans.ravel())[::2]
+    else:
+        syllable_tones: NDArray = np.zeros(0, dtype=np.int8)
+
+    word_starts: NDArray = np.cumsum([0] + [len(pinyin) + 1 for pinyin in pinyins[:-1]]).astype(np.int64)
+    word_indices: NDArray = np.searchsorted(word_starts, spans[:, 0], side='right') - 1
+    word_offsets: NDArray = np.concatenate(([0], np.cumsum(np.bincount(word_indices, minlength=len(pinyins)))))
+    local_spans: NDArray = spans - word_starts[word_indices][:, np.newaxis]
+    return ToneAnalysis(syllable_tones.astype(np.int8), local_spans[:, 0], local_spans[:, 1],
+                        word_offsets.astype(np.int64))
+
+
+# Dictionaries repeat the same pinyins a lot: each distinct pinyin is only split once, then the results are gathered.
+@beartype
+def analyze_pinyins(pinyins: List[str]) -> ToneAnalysis:
+    unique_indices: Dict[str, int] = {}
+    inverse: NDArray = np.array([unique_indices.setdefault(pinyin, len(unique_indices)) for pinyin in pinyins],
+                                dtype=np.int64)
+    unique: ToneAnalysis = analyze_unique_pinyins(list(unique_indices))
+    counts: NDArray = np.diff(unique.word_offsets)[inverse]
+    word_offsets: NDArray = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+    gather: NDArray = np.arange(word_offsets[-1]) + np.repeat(unique.word_offsets[:-1][inverse] - word_offsets[:-1],
+                                                              counts)
+    return ToneAnalysis(unique.tones[gather], unique.starts[gather], unique.ends[gather], word_offsets)
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) < 2:
+        print('Usage: python tone_analysis.py pinyin [pinyin ...]')
+        raise Exception()
+    words: List[str] = sys.argv[1:]
+    analysis: ToneAnalysis = analyze_pinyins(words)
+    for word_index, word in enumerate(words):
+        syllables: List[str] = [word[start:end] for start, end in analysis.word_spans(word_index)]
+        print(f'{word}: {list(zip(syllables, analysis.word_tones(word_index).tolist()))}')
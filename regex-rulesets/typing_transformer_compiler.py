@@ -0,0 +1,139 @@
+# MIT License
+#
+# Copyright (c) 2023 ESUNA - Sourigna SIMMALAVONG
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import argparse
+import random
+import sys
+from pathlib import Path
+
+from beartype import beartype
+from beartype.typing import List, Dict, Set, Tuple
+
+from typing_transformer_engine import TypingRule, TypingEngine, read_rules
+
+# Minimizes a typing transformer rule set, the plugin testing every rule on each key:
+# - duplicated rules (same input) are dropped, the first one wins like in the plugin,
+# - shadowed rules are dropped: while typing their input, a shorter rule already rewrote the text, so they can never
+#   fire. E.g. 'a^^|' never fires: typing a^ already gives â (then 'â^|' gives ǎ).
+# The remaining rules are ordered deterministically: typed rules first, longest input first, then by input.
+
+
+class CompileReport:
+    @beartype
+    def __init__(self, rules: List[TypingRule]):
+        self.rules: int = len(rules)
+        self.max_length: int = max((len(rule.before) + len(rule.after) for rule in rules), default=0)
+        self.duplicates: List[Tuple[TypingRule, TypingRule]] = []  # (dropped, kept)
+        self.shadowed: List[Tuple[TypingRule, str]] = []  # (dropped, what typing its input gives instead)
+
+
+@beartype
+def rule_key(rule: TypingRule) -> Tuple[str, str, str]:
+    return rule.kind, rule.before, rule.after
+
+
+@beartype
+def find_duplicates(rules: List[TypingRule]) -> Tuple[List[TypingRule], List[Tuple[TypingRule, TypingRule]]]:
+    kept: Dict[Tuple[str, str, str], TypingRule] = {}
+    duplicates: List[Tuple[TypingRule, TypingRule]] = []
+    for rule in rules:
+        key: Tuple[str, str, str] = rule_key(rule)
+        if key in kept:
+            duplicates.append((rule, kept[key]))
+        else:
+            kept[key] = rule
+    return list(kept.values()), duplicates
+
+
+# A typed rule is shadowed if typing its input but the last key already changes the text. Rules can only make it
+# worse with text typed before, a longer match being also a rewrite.
+@beartype
+def find_shadowed(rules: List[TypingRule]) -> List[Tuple[TypingRule, str]]:
+    engine: TypingEngine = TypingEngine(rules)
+    shadowed: List[Tuple[TypingRule, str]] = []
+    for rule in rules:
+        if rule.typed and len(rule.before) > 1:
+            typed: str = engine.transform(rule.before[:-1])
+            if typed != rule.before[:-1]:
+                shadowed.append((rule, typed + rule.before[-1]))
+    return shadowed
+
+
+@beartype
+def sort_key(rule: TypingRule) -> Tuple[bool, int, str, str]:
+    return not rule.typed, -len(rule.before) - len(rule.after), rule.before, rule.after
+
+
+@beartype
+def compile_rules(rules: List[TypingRule]) -> Tuple[List[TypingRule], CompileReport]:
+    report: CompileReport = CompileReport(rules)
+    unique: List[TypingRule]
+    unique, report.duplicates = find_duplicates(rules)
+    report.shadowed = find_shadowed(unique)
+    shadowed_lines: Set[int] = {rule.line for rule, _ in report.shadowed}
+    return sorted((rule for rule in unique if rule.line not in shadowed_lines), key=sort_key), report
+
+
+# The minimized rules must type any text the same as the original ones
+@beartype
+def check_equivalence(rules: List[TypingRule], compiled: List[TypingRule], keys: int, seed: int) -> bool:
+    alphabet: List[str] = sorted({character for rule in rules if rule.typed for character in rule.before} | {' ', 'x'})
+    text: str = ''.join(random.Random(seed).choice(alphabet) for _ in range(keys))
+    return TypingEngine(rules).transform(text) == TypingEngine(compiled).transform(text)
+
+
+if __name__ == '__main__':
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description='Remove the duplicated and shadowed typing transformer rules, and sort the remaining ones.')
+    parser.add_argument('--rules', type=Path, help='rules file (default: the rules of typing_transformer_rules_generator)')
+    parser.add_argument('--output', type=Path, help='minimized rules file (default: stdout)')
+    parser.add_argument('--check', type=int, default=100000, metavar='KEYS',
+                        help='number of random keys typed with both rule sets to check they are equivalent')
+    args: argparse.Namespace = parser.parse_args()
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+    original: List[TypingRule] = read_rules(args.rules)
+    minimized: List[TypingRule]
+    compile_report: CompileReport
+    minimized, compile_report = compile_rules(original)
+    after: CompileReport = CompileReport(minimized)
+
+    for dropped, kept_rule in compile_report.duplicates:
+        print(f'line {dropped.line}: duplicate of line {kept_rule.line}: {dropped.source.strip()}', file=sys.stderr)
+    for dropped, typed_instead in compile_report.shadowed:
+        print(f'line {dropped.line}: shadowed, typing its input gives {typed_instead!r}: {dropped.source.strip()}',
+              file=sys.stderr)
+    print(f'rules: {compile_report.rules} -> {after.rules}, '
+          f'max match length: {compile_report.max_length} -> {after.max_length}', file=sys.stderr)
+    equivalent: bool = args.check == 0 or check_equivalence(original, minimized, args.check, 0)
+    if not equivalent:
+        print('the minimized rules do not type the same text', file=sys.stderr)
+
+    rules_text: str = ''.join(f'{rule.source.strip()}\n' for rule in minimized)
+    if args.output is None:
+        sys.stdout.write(rules_text)
+    else:
+        tmp_path: Path = args.output.with_name(f'{args.output.name}.tmp')
+        tmp_path.write_text(rules_text, encoding='utf-8')
+        tmp_path.replace(args.output)
+    sys.exit(0 if equivalent else 1)
@@ -0,0 +1,188 @@
+# MIT License
+#
+# Copyright (c) 2023 ESUNA - Sourigna SIMMALAVONG
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+import argparse
+import re
+import sys
+from pathlib import Path
+
+from beartype import beartype
+from beartype.typing import List, Dict, Optional, Tuple, Iterable, Iterator, Pattern
+
+from typing_transformer_rules_generator import make_rules
+
+# Applies typing transformer rules offline, as if the text was typed key by key in obsidian:
+# after each key, the longest rule input ending at the cursor is replaced by its output.
+# Rule inputs are stored reversed in a trie, walked backwards from the cursor: at most the length of the longest input
+# per key, i.e. linear in the text size.
+# Rules with text after the cursor (auto-completion of parenthesis) and deletion rules (-x, on backspace) do not
+# apply to typed text and are ignored.
+
+quoted: str = r"'((?:[^'\\]|\\.)*)'"
+rule_pattern: Pattern = re.compile(fr'^\s*{quoted}\s*(->|-x)\s*{quoted}\s*(?:#.*)?$')
+cursor: str = '|'
+escapes: Dict[str, str] = {'n': '\n', "'": "'", '"': '"', '\\': '\\', cursor: cursor}
+
+
+class TypingRule:
+    __slots__ = ('before', 'after', 'kind', 'output_before', 'output_after', 'line', 'source')
+
+    @beartype
+    def __init__(self, before: str, after: str, kind: str, output_before: str, output_after: str, line: int,
+                 source: str):
+        self.before: str = before  # text before the cursor
+        self.after: str = after  # text after the cursor
+        self.kind: str = kind  # -> or -x
+        self.output_before: str = output_before
+        self.output_after: str = output_after
+        self.line: int = line  # in the rules text, starting at 1
+        self.source: str = source  # the rule line as written
+
+    @property
+    def typed(self) -> bool:
+        # Whether the rule applies to typed text
+        return self.kind == '->' and self.after == '' and self.output_after == ''
+
+
+# Splits a quoted rule side at its cursor: \n is a newline, \' \" \\ and \| the plain characters, any other backslash is
+# kept (\sum is typed as is).
+@beartype
+def unescape(side: str) -> Tuple[str, str]:
+    parts: List[List[str]] = [[]]
+    characters: Iterator[str] = iter(side)
+    for character in characters:
+        if character == '\\':
+            escaped: str = next(characters, '')
+            parts[-1].append(escapes.get(escaped, f'\\{escaped}'))
+        elif character == cursor:
+            parts.append([])
+        else:
+            parts[-1].append(character)
+    if len(parts) != 2:
+        raise Exception(f'expected one cursor in rule side: {side}')
+    return ''.join(parts[0]), ''.join(parts[1])
+
+
+@beartype
+def parse_rules(text: str) -> List[TypingRule]:
+    rules: List[TypingRule] = []
+    for line_number, line in enumerate(text.splitlines(), 1):
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+        match: Optional[re.Match] = rule_pattern.match(line)
+        if match is None:
+            raise Exception(f'invalid rule at line {line_number}: {line}')
+        before, after = unescape(match.group(1))
+        output_before, output_after = unescape(match.group(3))
+        rules.append(TypingRule(before, after, match.group(2), output_before, output_after, line_number, line))
+    return rules
+
+
+class TypingEngine:
+    @beartype
+    def __init__(self, rules: List[TypingRule]):
+        # Reversed trie: node[character] -> child node, node[''] -> output of the rule ending at this node
+        self.trie: Dict[str, dict] = {}
+        self.max_length: int = 0
+        for rule in rules:
+            if not rule.typed or not rule.before:
+                continue
+            node: Dict[str, dict] = self.trie
+            for character in reversed(rule.before):
+                node = node.setdefault(character, {})
+            # First rule wins on duplicated inputs, like the first match in the rules list
+            node.setdefault('', rule.output_before)
+            self.max_length = max(self.max_length, len(rule.before))
+
+    # Called for every character: not wrapped by beartype.
+    def type_text(self, text: str, typed: Optional[List[str]] = None) -> List[str]:
+        typed = [] if typed is None else typed
+        trie: Dict[str, dict] = self.trie
+        for character in text:
+            typed.append(character)
+            node: Optional[Dict[str, dict]] = trie.get(character)
+            if node is None:
+                continue
+            output: Optional[str] = node.get('')
+            length: int = 1
+            match_length: int = 1
+            index: int = len(typed) - 2
+            while index >= 0:
+                node = node.get(typed[index])
+                if node is None:
+                    break
+                length += 1
+                if '' in node:
+                    output = node['']
+                    match_length = length
+                index -= 1
+            if output is not None:
+                del typed[len(typed) - match_length:]
+                typed.extend(output)
+        return typed
+
+    @beartype
+    def transform(self, text: str) -> str:
+        return ''.join(self.type_text(text))
+
+    # Line by line: a rule input never spans a newline once the rules with text after the cursor are ignored, except
+    # if it contains a newline itself, in which case the previous line is kept until the next one is typed.
+    @beartype
+    def transform_lines(self, lines: Iterable[str]) -> Iterator[str]:
+        typed: List[str] = []
+        for line in lines:
+            self.type_text(line, typed)
+            if len(typed) > self.max_length:
+                kept: int = self.max_length
+                yield ''.join(typed[:len(typed) - kept])
+                del typed[:len(typed) - kept]
+        yield ''.join(typed)
+
+
+@beartype
+def read_rules(path: Optional[Path]) -> List[TypingRule]:
+    return parse_rules(make_rules() if path is None else path.read_text(encoding='utf-8'))
+
+
+if __name__ == '__main__':
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description='Apply the typing transformer rules to text typed elsewhere, e.g. ni`\'hao^^ -> nǐhaǒ.')
+    parser.add_argument('paths', type=Path, nargs='+', help='text files, - reads stdin')
+    parser.add_argument('--rules', type=Path, help='rules file (default: the rules of typing_transformer_rules_generator)')
+    parser.add_argument('--in-place', action='store_true', help='rewrite the files instead of printing them')
+    args: argparse.Namespace = parser.parse_args()
+    sys.stdin.reconfigure(encoding='utf-8')
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    engine: TypingEngine = TypingEngine(read_rules(args.rules))
+    for path in args.paths:
+        if path == Path('-'):
+            sys.stdout.writelines(engine.transform_lines(sys.stdin))
+            continue
+        with path.open(encoding='utf-8') as file:
+            if not args.in_place:
+                sys.stdout.writelines(engine.transform_lines(file))
+                continue
+            tmp_path: Path = path.with_name(f'{path.name}.tmp')
+            with tmp_path.open('w', encoding='utf-8') as tmp_file:
+                tmp_file.writelines(engine.transform_lines(file))
+        tmp_path.replace(path)
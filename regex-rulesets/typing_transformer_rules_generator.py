@@ -20,11 +20,14 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import sys
+from functools import lru_cache
+from pathlib import Path
+
 from beartype import beartype
-from beartype.typing import Final, List, Dict
-import numpy as np
+from beartype.typing import Final, List, Dict, Iterable, Iterator, Sequence
 
-from numpy._typing import NDArray
+# Plain nested lists instead of numpy arrays: importing numpy took most of the generation time.
 
 # ǖ: TODO or not TODO?
 
@@ -35,125 +38,142 @@ untoned_characters_indices: Final[Dict[str, int]] = {'a': 0, 'e': 1, 'i': 2, 'o'
 # a`  = à
 # a^^ = ǎ
 # a`" = ǎ  # for convenience in dvorak programmer, no need to release the shift while doing both accents
-tones: Final[NDArray] = np.array([['--', '', ''],
-                                  [r"\'", '', ''],
-                                  [r"`\'", r"\'\"", r"^^"],
-                                  ['`', '', '']])
+tones: Final[List[List[str]]] = [['--', '', ''],
+                                 [r"\'", '', ''],
+                                 [r"`\'", r"\'\"", r"^^"],
+                                 ['`', '', '']]
 tones_indices: Final[Dict[int, int]] = {1: 0, 2: 1, 3: 2, 4: 3, 5: 2}
-other_accents: Final[NDArray] = np.array(['^', '..'])
+other_accents: Final[List[str]] = ['^', '..']
 other_accents_indices: Final[Dict[int, int]] = {1: 0, 2: 1}
 lowercase_index: Final[int] = 0
 uppercase_index: Final[int] = 1
 
-unaccented_characters: Final[NDArray] = np.array(['a', 'A', 'e', 'E', 'i', 'I', 'o', 'O', 'u', 'U'])
+unaccented_characters: Final[List[str]] = ['a', 'A', 'e', 'E', 'i', 'I', 'o', 'O', 'u', 'U']
+# [char][capital][accent]
+toned_characters: Final[List[List[List[str]]]] = [[['ā', 'á', 'ǎ', 'à'], ['Ā', 'Á', 'Ǎ', 'À']],
+                                                  [['ē', 'é', 'ě', 'è'], ['Ē', 'É', 'Ě', 'È']],
+                                                  [['ī', 'í', 'ǐ', 'ì'], ['Ī', 'Í', 'Ǐ', 'Ì']],
+                                                  [['ō', 'ó', 'ǒ', 'ò'], ['Ō', 'Ó', 'Ǒ', 'Ò']],
+                                                  [['ū', 'ú', 'ǔ', 'ù'], ['Ū', 'Ú', 'Ǔ', 'Ù']]]
 # [char][capital][accent]
-toned_characters: Final[NDArray] = np.array([[['ā', 'á', 'ǎ', 'à'], ['Ā', 'Á', 'Ǎ', 'À']],
-                                             [['ē', 'é', 'ě', 'è'], ['Ē', 'É', 'Ě', 'È']],
-                                             [['ī', 'í', 'ǐ', 'ì'], ['Ī', 'Í', 'Ǐ', 'Ì']],
-                                             [['ō', 'ó', 'ǒ', 'ò'], ['Ō', 'Ó', 'Ǒ', 'Ò']],
-                                             [['ū', 'ú', 'ǔ', 'ù'], ['Ū', 'Ú', 'Ǔ', 'Ù']]])
+characters_other_accents: Final[List[List[List[str]]]] = [[['â', 'ä'], ['Â', 'Ä']],
+                                                          [['ê', 'ë'], ['Ê', 'Ë']],
+                                                          [['î', 'ï'], ['Î', 'Ï']],
+                                                          [['ô', 'ö'], ['Ô', 'Ö']],
+                                                          [['û', 'ü'], ['Û', 'Ü']]]
+# [capital][accent], not typed by the rules but stripped by strip_accents
+toned_umlauts: Final[List[List[str]]] = [['ǖ', 'ǘ', 'ǚ', 'ǜ'], ['Ǖ', 'Ǘ', 'Ǚ', 'Ǜ']]
+
+unaccented_other_characters: Final[List[str]] = ['c', 'C']
+other_characters_accents: Final[List[str]] = [',,']
 # [char][capital][accent]
-characters_other_accents: Final[NDArray] = np.array([[['â', 'ä'], ['Â', 'Ä']],
-                                                     [['ê', 'ë'], ['Ê', 'Ë']],
-                                                     [['î', 'ï'], ['Î', 'Ï']],
-                                                     [['ô', 'ö'], ['Ô', 'Ö']],
-                                                     [['û', 'ü'], ['Û', 'Ü']]])
+accented_other_characters: Final[List[List[List[str]]]] = [[['ç'], ['Ç']]]
 
-unaccented_other_characters: Final[NDArray] = np.array(['c', 'C'])
-other_characters_accents: Final[NDArray] = np.array([',,'])
-# [char][accent][capital]
-accented_other_characters: Final[NDArray] = np.array([[['ç'], ['Ç']]])
+# [char][capital][accent]: the 4 tones then the 2 other accents
+all_accented_characters: Final[List[List[List[str]]]] = [
+    [toned + other for toned, other in zip(toned_capitals, other_capitals)]
+    for toned_capitals, other_capitals in zip(toned_characters, characters_other_accents)]
 
-all_accented_characters: Final[NDArray] = np.dstack((toned_characters, characters_other_accents))
+
+# [char][capital][accent] -> [char * capital] in the same order as unaccented_characters
+@beartype
+def flatten(table: Sequence[Sequence[Sequence[str]]], accent_index: int) -> List[str]:
+    return [capitals[accent_index] for characters in table for capitals in characters]
+
+
+# Reverse maps, built at first use
+@lru_cache(maxsize=None)
+def accents_table() -> Dict[int, str]:
+    accented: Dict[str, str] = {}
+    for char_index, characters in enumerate(all_accented_characters):
+        for capital_index, accents in enumerate(characters):
+            for accent in accents:
+                accented[accent] = unaccented_characters[2 * char_index + capital_index]
+    for capital_index, umlauts in enumerate(toned_umlauts):
+        for umlaut in umlauts:
+            accented[umlaut] = 'uU'[capital_index]
+    for char_index, characters in enumerate(accented_other_characters):
+        for capital_index, accents in enumerate(characters):
+            for accent in accents:
+                accented[accent] = unaccented_other_characters[2 * char_index + capital_index]
+    return str.maketrans(accented)
 
 
 @beartype
 def unaccented_character(c: str) -> str:
     assert len(c) == 1
-    coords: NDArray = np.argwhere(all_accented_characters == c)
-    if not coords:
-        coords = np.argwhere(accented_other_characters == c)
-        if not coords:
-            return ''
-        else:
-            return unaccented_other_characters[coords[0]]
-    return unaccented_characters[coords[0]]
+    return accents_table().get(ord(c), '')
+
+
+# 'Zhōngguó, ça' -> 'Zhongguo, ca'
+@beartype
+def strip_accents(text: str) -> str:
+    return text.translate(accents_table())
 
 
 @beartype
-def make_add_accent_rule(inputs: NDArray) -> str:
-    input: str
-    accent: str
-    output: str
-    input, accent, output = inputs
+def strip_accents_lines(lines: Iterable[str]) -> Iterator[str]:
+    table: Dict[int, str] = accents_table()
+    for line in lines:
+        yield line.translate(table)
+
+
+@beartype
+def strip_accents_file(path: Path) -> Iterator[str]:
+    with path.open(encoding='utf-8') as file:
+        yield from strip_accents_lines(file)
+
+
+@beartype
+def make_add_accent_rule(input: str, accent: str, output: str) -> str:
     return f"'{input}{accent}|' -> '{output}|'"
 
 
 @beartype
-def make_remove_accent_rule(inputs: NDArray) -> str:
-    input: str
-    output: str
-    input, output = inputs
+def make_remove_accent_rule(input: str, output: str) -> str:
     return f"'{input}|' -x '{output}|'"
 
 
 @beartype
-def make_correct_ellipsis_rule(inputs: NDArray) -> str:
-    input: str
-    output: str
-    input, output = inputs
+def make_correct_ellipsis_rule(input: str, output: str) -> str:
     return f"'{input}.|' -> '{output}...|'"
 
 
 @beartype
-def make_3rd_tone_from_double_quotes_rule(inputs: NDArray) -> str:
-    input: str
-    output: str
-    input, output = inputs
+def make_3rd_tone_from_double_quotes_rule(input: str, output: str) -> str:
     return f"'{input}\"|' -> '{output}|'"
 
 
 @beartype
-def make_3rd_tone_from_double_circumflex_rule(inputs: NDArray) -> str:
-    input: str
-    output: str
-    input, output = inputs
+def make_3rd_tone_from_double_circumflex_rule(input: str, output: str) -> str:
     return f"'{input}^|' -> '{output}|'"
 
 
 @beartype
-def make_3rd_tone_from_quote_rule(inputs: NDArray) -> str:
-    input: str
-    output: str
-    input, output = inputs
+def make_3rd_tone_from_quote_rule(input: str, output: str) -> str:
     return fr"'{input}\'|' -> '{output}|'"
 
 
 @beartype
 def make_3rd_tone_rules() -> List[str]:
     tone2: str = '`'
-    tone2_index: int = np.where(tones == tone2)[0][0]
-    # [char][capital][accent]
-    input: NDArray = toned_characters[:, :, tone2_index]
-    input = input.reshape([input.size, 1])
+    tone2_index: int = next(index for index, tone in enumerate(tones) if tone2 in tone)
+    # [char * capital]
+    input: List[str] = flatten(toned_characters, tone2_index)
     tone3: str = r"`\'"
-    tone3_index: int = np.where(tones == tone3)[0][0]
-    output: NDArray = toned_characters[:, :, tone3_index]
-    output = output.reshape([output.size, 1])
-    input_output: NDArray = np.hstack((input, output))
+    tone3_index: int = next(index for index, tone in enumerate(tones) if tone3 in tone)
+    output: List[str] = flatten(toned_characters, tone3_index)
 
     rules: List[str] = []
     # 'à'' to 'ǎ'
-    rules += np.apply_along_axis(make_3rd_tone_from_quote_rule, 1, input_output).flat
+    rules += [make_3rd_tone_from_quote_rule(*input_output) for input_output in zip(input, output)]
     # 'à"' to 'ǎ'
-    rules += np.apply_along_axis(make_3rd_tone_from_double_quotes_rule, 1, input_output).flat
+    rules += [make_3rd_tone_from_double_quotes_rule(*input_output) for input_output in zip(input, output)]
 
     # 'â"' to 'ǎ'
-    circumflex_index: int = np.where(other_accents == '^')[0][0]
-    input = characters_other_accents[:, :, circumflex_index]
-    input = input.reshape([input.size, 1])
-    input_output: NDArray = np.hstack((input, output))
-    rules += np.apply_along_axis(make_3rd_tone_from_double_circumflex_rule, 1, input_output).flat
+    circumflex_index: int = other_accents.index('^')
+    input = flatten(characters_other_accents, circumflex_index)
+    rules += [make_3rd_tone_from_double_circumflex_rule(*input_output) for input_output in zip(input, output)]
 
     return rules
 
@@ -162,44 +182,28 @@ def make_3rd_tone_rules() -> List[str]:
 def make_correct_ellipsis_rules() -> List[str]:
     # 'ä.' to 'a...'
     other_accent: str = '..'
-    other_accent_index: int = np.where(other_accents == other_accent)[0][0]
-    # [char][capital][accent]
-    input: NDArray = characters_other_accents[:, :, other_accent_index]
-    input = input.reshape([input.size, 1])
-    input_output: NDArray = np.hstack(
-        (input,
-         unaccented_characters.reshape(([unaccented_characters.size, 1]))))
-    current_rules: NDArray = np.apply_along_axis(make_correct_ellipsis_rule, 1, input_output)
-    return List[str](current_rules.flat)
+    other_accent_index: int = other_accents.index(other_accent)
+    # [char * capital]
+    input: List[str] = flatten(characters_other_accents, other_accent_index)
+    return [make_correct_ellipsis_rule(*input_output) for input_output in zip(input, unaccented_characters)]
 
 
 @beartype
 def make_toneX_to_letter_rules() -> List[str]:
     rules: List[str] = []
 
-    input: NDArray = toned_characters.reshape([toned_characters.size, 1])
-    output: NDArray = unaccented_characters.reshape(([unaccented_characters.size, 1]))
-    output = np.repeat(output, tones.shape[0])
-    output = output.reshape(([output.size, 1]))
-    input_output: NDArray = np.hstack((input, output))
-    current_rules: NDArray = np.apply_along_axis(make_remove_accent_rule, 1, input_output)
-    rules += current_rules.flat
-
-    input: NDArray = accented_other_characters.reshape([accented_other_characters.size, 1])
-    output: NDArray = unaccented_other_characters.reshape(([unaccented_other_characters.size, 1]))
-    output = np.repeat(output, accented_other_characters.size / 2)  # div 2 because lower case and upper case
-    output = output.reshape(([output.size, 1]))
-    input_output: NDArray = np.hstack((input, output))
-    current_rules: NDArray = np.apply_along_axis(make_remove_accent_rule, 1, input_output)
-    rules += current_rules.flat
+    # [char][capital][accent] order, each letter repeated for its 4 tones
+    input: List[str] = [accent for characters in toned_characters for accents in characters for accent in accents]
+    output: List[str] = [character for character in unaccented_characters for _ in tones]
+    rules += [make_remove_accent_rule(*input_output) for input_output in zip(input, output)]
+
+    input = [accent for characters in accented_other_characters for accents in characters for accent in accents]
+    output = unaccented_other_characters
+    rules += [make_remove_accent_rule(*input_output) for input_output in zip(input, output)]
 
     # Characters like "ç" -> "c"
     # for other_characters_accent_index, other_characters_accent in enumerate(other_characters_accents):
-    input: NDArray = accented_other_characters.reshape(([accented_other_characters.size, 1]))
-    output: NDArray = unaccented_other_characters.reshape(([unaccented_other_characters.size, 1]))
-    input_output: NDArray = np.hstack((input, output))
-    current_rules: NDArray = np.apply_along_axis(make_remove_accent_rule, 1, input_output)
-    rules += current_rules.flat
+    rules += [make_remove_accent_rule(*input_output) for input_output in zip(input, output)]
 
     return rules
 
@@ -211,37 +215,22 @@ def make_letter_to_toneX_rules() -> List[str]:
         for tone_modifier in tone:
             if tone_modifier == '':
                 continue
-            # [char][capital][accent]
-            output: NDArray = toned_characters[:, :, tone_index]
-            output = output.reshape([output.size, 1])
-            input_output: NDArray = np.hstack(
-                (unaccented_characters.reshape(([unaccented_characters.size, 1])),
-                 [[tone_modifier]] * unaccented_characters.size,
-                 output))
-            current_rules: NDArray = np.apply_along_axis(make_add_accent_rule, 1, input_output)
-            rules += current_rules.flat
+            # [char * capital]
+            outputs: List[str] = flatten(toned_characters, tone_index)
+            rules += [make_add_accent_rule(input, tone_modifier, output)
+                      for input, output in zip(unaccented_characters, outputs)]
 
     # 'â' and 'ä' accents
     for other_accent_index, other_accent in enumerate(other_accents):
-        # [char][capital][accent]
-        output: NDArray = characters_other_accents[:, :, other_accent_index]
-        output = output.reshape([output.size, 1])
-        input_output: NDArray = np.hstack(
-            (unaccented_characters.reshape(([unaccented_characters.size, 1])),
-             [[other_accent]] * unaccented_characters.size,
-             output))
-        current_rules: NDArray = np.apply_along_axis(make_add_accent_rule, 1, input_output)
-        rules += current_rules.flat
+        outputs: List[str] = flatten(characters_other_accents, other_accent_index)
+        rules += [make_add_accent_rule(input, other_accent, output)
+                  for input, output in zip(unaccented_characters, outputs)]
 
     # Characters like "c" -> "ç"
     for other_characters_accent_index, other_characters_accent in enumerate(other_characters_accents):
-        output: NDArray = accented_other_characters[:, :, other_characters_accent_index]
-        output = output.reshape([output.size, 1])
-        input_output: NDArray = np.hstack(
-            (unaccented_other_characters.reshape(([unaccented_other_characters.size, 1])),
-             [[other_characters_accent]] * unaccented_other_characters.size, output))
-        current_rules: NDArray = np.apply_along_axis(make_add_accent_rule, 1, input_output)
-        rules += current_rules.flat
+        outputs: List[str] = flatten(accented_other_characters, other_characters_accent_index)
+        rules += [make_add_accent_rule(input, other_characters_accent, output)
+                  for input, output in zip(unaccented_other_characters, outputs)]
 
     return rules
 
@@ -354,4 +343,10 @@ def make_rules() -> str:
 
 
 if __name__ == '__main__':
-    print(make_rules())
+    if len(sys.argv) > 1:
+        # python typing_transformer_rules_generator.py text.md [...]: prints the texts without accents
+        sys.stdout.reconfigure(encoding='utf-8')
+        for text_path in sys.argv[1:]:
+            sys.stdout.writelines(strip_accents_file(Path(text_path)))
+    else:
+        print(make_rules())